@@ -1,5 +1,5 @@
 import json
-from typing import Any, List
+from typing import Any, List, Literal
 from pydantic.fields import FieldInfo
 from pydantic_settings import (
     BaseSettings,
@@ -11,6 +11,8 @@ from pydantic import Field
 
 
 class CustomDotEnvSettingsSource(DotEnvSettingsSource):
+    LIST_FIELDS = {"BACKEND_CORS_ORIGINS", "AD_SERVERS"}
+
     def prepare_field_value(
         self,
         field_name: str,
@@ -18,7 +20,7 @@ class CustomDotEnvSettingsSource(DotEnvSettingsSource):
         value: Any,
         value_is_complex: bool,
     ) -> Any:
-        if field_name == "BACKEND_CORS_ORIGINS" and isinstance(value, str):
+        if field_name in self.LIST_FIELDS and isinstance(value, str):
             try:
                 # Try JSON array first
                 result = json.loads(value)
@@ -39,6 +41,8 @@ class Settings(BaseSettings):
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_DAYS: int
+    # Embed a versioned page-permission bitmap ("perm" claim) in access tokens
+    EMBED_PERMISSIONS_IN_TOKEN: bool = False
     BACKEND_CORS_ORIGINS: List[str] = Field(default_factory=list)
     LDAP_USER_ATTRIBUTES: List[str] = Field(default_factory=list)
     AD_SERVER: str
@@ -48,6 +52,13 @@ class Settings(BaseSettings):
     AD_BASE_DN: str
     AD_USE_TLS: bool
     OU_PARENT_BASE: str
+    # Domain controllers as "host" or "host:port"; falls back to AD_SERVER/AD_PORT
+    AD_SERVERS: List[str] = Field(default_factory=list)
+    AD_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    AD_HEALTH_CHECK_INTERVAL_SECONDS: float = 30.0
+    AD_LATENCY_EWMA_ALPHA: float = 0.3
+    AD_CIRCUIT_FAILURE_THRESHOLD: int = 3
+    AD_CIRCUIT_RESET_SECONDS: float = 60.0
     # Daatabase connection settings
     DB_SERVER: str
     DB_USER: str
@@ -55,6 +66,65 @@ class Settings(BaseSettings):
     DB_NAME: str
     # Logging settings
     LOG_LEVEL: str = "INFO"
+    # Rows per statement for bulk endpoints
+    BULK_CHUNK_SIZE: int = 500
+    BULK_MAX_ITEMS: int = 10000
+    # Cache-Control for reference-data GETs (revalidated with ETags)
+    REFERENCE_DATA_CACHE_CONTROL: str = "private, no-cache"
+    # How often reference-data snapshots are compared with the database
+    SNAPSHOT_CHECK_INTERVAL_SECONDS: float = 30.0
+    # Rows fetched per round trip by the streaming exports
+    EXPORT_BATCH_ROWS: int = 1000
+    # Audit trail: overhead warning threshold per transaction, and the
+    # optional write-behind queue (transactions) and its batch size (rows)
+    AUDIT_OVERHEAD_BUDGET_MS: float = 10.0
+    AUDIT_WRITE_BEHIND: bool = False
+    AUDIT_QUEUE_MAX: int = 1000
+    AUDIT_WRITE_BATCH: int = 500
+    # Audit values of this many bytes and more are zlib-compressed; edits of
+    # texts this long and more are stored as deltas (0 disables deltas)
+    AUDIT_COMPRESS_MIN_BYTES: int = 256
+    AUDIT_DELTA_MIN_LENGTH: int = 0
+    # Audited changes per record between full snapshots (0 disables them)
+    AUDIT_SNAPSHOT_INTERVAL: int = 50
+    # Monthly log partitions: months created ahead, retention (0 keeps
+    # everything) and where expired months are archived before the drop
+    PARTITION_MAINTENANCE_ENABLED: bool = False
+    PARTITION_MAINTENANCE_INTERVAL_SECONDS: float = 86400.0
+    PARTITION_MONTHS_AHEAD: int = 3
+    AUDIT_LOG_RETENTION_MONTHS: int = 24
+    LOGIN_LOG_RETENTION_MONTHS: int = 12
+    PARTITION_ARCHIVE_DIR: str = "archive"
+    # Buffered login log ingestion: buffer bound (rows), flush size and
+    # interval, how long a request waits for room, and when it is answered
+    LOGIN_INGEST_BUFFER_MAX: int = 20000
+    LOGIN_INGEST_FLUSH_ROWS: int = 1000
+    LOGIN_INGEST_FLUSH_MS: float = 200.0
+    LOGIN_INGEST_ENQUEUE_TIMEOUT_MS: float = 1000.0
+    LOGIN_INGEST_DURABILITY: Literal["accepted", "committed"] = "accepted"
+    # Hourly login rollups: fold interval and login_log ids per transaction
+    LOGIN_ROLLUP_INTERVAL_SECONDS: float = 60.0
+    LOGIN_ROLLUP_BATCH_ROWS: int = 50000
+    # Failed-login counters per device IP and phone: sliding window, its
+    # buckets, keys kept per kind, and failures per phone that block it
+    # (0 disables auto-blocking)
+    LOGIN_MONITOR_WINDOW_SECONDS: float = 300.0
+    LOGIN_MONITOR_BUCKETS: int = 30
+    LOGIN_MONITOR_MAX_KEYS: int = 50000
+    LOGIN_MONITOR_BLOCK_THRESHOLD: int = 0
+    # Blocked phone numbers held in memory: country code for normalizing
+    # numbers, bloom filter instead of a set (and its false positive
+    # rate), and how often to rebuild from the database
+    PHONE_COUNTRY_CODE: str = "20"
+    BLOCKED_PHONES_BLOOM: bool = False
+    BLOCKED_PHONES_BLOOM_ERROR_RATE: float = 0.001
+    BLOCKED_PHONES_RELOAD_SECONDS: float = 300.0
+    # Page size for list endpoints
+    PAGE_SIZE_DEFAULT: int = 100
+    PAGE_SIZE_MAX: int = 1000
+    # Login negative cache for unknown/disabled usernames
+    NEGATIVE_CACHE_TTL_SECONDS: float = 60.0
+    NEGATIVE_CACHE_MAX_ENTRIES: int = 10000
 
     DEFAULT_ADMIN_PASSWORD: str
 
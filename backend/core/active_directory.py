@@ -1,13 +1,16 @@
 import asyncio
 import logging
 import re
+import time
 from typing import List, Optional
 
 import bonsai
 from bonsai import AuthenticationError, LDAPError, LDAPSearchScope
 
-from config import Settings
-from core.schema import DomainUser
+from config import settings
+from core.domain_controllers import DomainController, domain_controller_pool
+from core.negative_cache import negative_username_cache
+from core.schema import DomainUser, DomainUserWithGroups
 
 
 logger = logging.getLogger(__name__)
@@ -23,22 +26,25 @@ class ActiveDirectoryService:
         "mail",
     ]
     LDAP_PAGED_SEARCH_SIZE = 250
+    # AD bind sub-error returned for disabled accounts ("data 533")
+    AD_ACCOUNT_DISABLED_CODE = "data 533"
 
     def __init__(
         self, username: Optional[str] = None, password: Optional[str] = None
     ):
         # === Service Account Configuration ===
-        self.OU_PARENT_BASE = Settings.OU_PARENT_BASE
-        self.AD_SERVER = Settings.AD_SERVER
-        self.AD_PORT = Settings.AD_PORT
-        self.AD_BIND_USERNAME = Settings.AD_BIND_USERNAME
-        self.AD_BIND_PASSWORD = Settings.AD_BIND_PASSWORD
-        self.AD_BASE_DN = Settings.AD_BASE_DN
-        self.AD_USE_TLS = Settings.AD_USE_TLS
+        self.OU_PARENT_BASE = settings.OU_PARENT_BASE
+        self.AD_BIND_USERNAME = settings.AD_BIND_USERNAME
+        self.AD_BIND_PASSWORD = settings.AD_BIND_PASSWORD
+        self.AD_BASE_DN = settings.AD_BASE_DN
+        self.AD_USE_TLS = settings.AD_USE_TLS
+        self.AD_CONNECT_TIMEOUT = settings.AD_CONNECT_TIMEOUT_SECONDS
 
         # Optional user credentials
         self.username = username if username else self.AD_BIND_USERNAME
         self.password = password if password else self.AD_BIND_PASSWORD
+        # Set when the user bind is rejected because the account is disabled
+        self.account_disabled = False
 
     @staticmethod
     def extract_cn_from_dn(dn: Optional[str]) -> Optional[str]:
@@ -55,22 +61,18 @@ class ActiveDirectoryService:
         use_service_account: bool = True,
         username: Optional[str] = None,
         password: Optional[str] = None,
+        dc: Optional[DomainController] = None,
     ) -> bonsai.LDAPClient:
-        """Creates and configures an LDAP client instance."""
+        """Creates and configures an LDAP client instance for a domain controller."""
+        dc = dc or domain_controller_pool.candidates()[0]
         protocol = "ldaps" if self.AD_USE_TLS else "ldap"
-        client = bonsai.LDAPClient(
-            f"{protocol}://{self.AD_SERVER}:{self.AD_PORT}"
-        )
+        client = bonsai.LDAPClient(f"{protocol}://{dc.address}")
         try:
             if self.AD_USE_TLS:
                 client.set_tls_options(bonsai.TLS_DEMAND, bonsai.TLS_ALLOW)
-                logger.info(
-                    f"Configured LDAPS connection to {self.AD_SERVER}:{self.AD_PORT}"
-                )
+                logger.info(f"Configured LDAPS connection to {dc.address}")
             else:
-                logger.info(
-                    f"Configured LDAP connection to {self.AD_SERVER}:{self.AD_PORT}"
-                )
+                logger.info(f"Configured LDAP connection to {dc.address}")
 
             if use_service_account:
                 client.set_credentials(
@@ -92,6 +94,49 @@ class ActiveDirectoryService:
             logger.error(f"Failed to configure LDAP client: {e}")
             raise
 
+    async def _connect_with_failover(
+        self,
+        use_service_account: bool = True,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+    ):
+        """
+        Connects to the fastest healthy domain controller, moving on to the
+        next candidate on network errors. An AuthenticationError means the
+        DC answered, so it is raised immediately instead of failing over.
+        Returns (client, connection); the caller owns the connection.
+        """
+        last_error: Optional[Exception] = None
+        for dc in domain_controller_pool.candidates():
+            client = self.get_ldap_client(
+                use_service_account=use_service_account,
+                username=username,
+                password=password,
+                dc=dc,
+            )
+            started = time.perf_counter()
+            try:
+                conn = await client.connect(
+                    is_async=True, timeout=self.AD_CONNECT_TIMEOUT
+                )
+            except AuthenticationError:
+                domain_controller_pool.record_success(
+                    dc, (time.perf_counter() - started) * 1000
+                )
+                raise
+            except (LDAPError, OSError, asyncio.TimeoutError) as e:
+                domain_controller_pool.record_failure(dc, e)
+                logger.warning(
+                    f"Domain controller {dc.address} unavailable: {e}"
+                )
+                last_error = e
+                continue
+            domain_controller_pool.record_success(
+                dc, (time.perf_counter() - started) * 1000
+            )
+            return client, conn
+        raise last_error
+
     async def _get_connected_ldap_client(self) -> bonsai.LDAPClient:
         """
         Try to connect using instance credentials first;
@@ -100,17 +145,23 @@ class ActiveDirectoryService:
         # Try user credentials if provided
         if self.username and self.password:
             try:
-                client = self.get_ldap_client(
+                client, conn = await self._connect_with_failover(
                     use_service_account=False,
                     username=self.username,
                     password=self.password,
                 )
-                await client.connect(is_async=True, timeout=10)
+                conn.close()
                 logger.info(
                     f"Connected with user credentials: {self.username}"
                 )
                 return client
-            except AuthenticationError:
+            except AuthenticationError as e:
+                if self.AD_ACCOUNT_DISABLED_CODE in str(e):
+                    self.account_disabled = True
+                    logger.warning(
+                        f"User '{self.username}' is disabled in Active Directory."
+                    )
+                    raise
                 logger.warning(
                     f"User authentication failed for '{self.username}', falling back to service account."
                 )
@@ -118,20 +169,22 @@ class ActiveDirectoryService:
                 logger.error(f"Unexpected error with user credentials: {e}")
 
         # Fallback to service account
-        client = self.get_ldap_client(use_service_account=True)
-        await client.connect(is_async=True, timeout=10)
+        client, conn = await self._connect_with_failover(
+            use_service_account=True
+        )
+        conn.close()
         logger.info("Connected with service account credentials.")
         return client
 
     async def authenticate_user(self, username: str, password: str) -> bool:
         """Bind with user credentials to verify password only."""
         try:
-            client = self.get_ldap_client(
+            _, conn = await self._connect_with_failover(
                 use_service_account=False, username=username, password=password
             )
-            async with client.connect(is_async=True, timeout=10):
-                logger.info(f"User '{username}' authenticated successfully.")
-                return True
+            conn.close()
+            logger.info(f"User '{username}' authenticated successfully.")
+            return True
         except AuthenticationError:
             logger.warning(f"Authentication failed for user '{username}'.")
             return False
@@ -287,40 +340,121 @@ class ActiveDirectoryService:
         for idx, user in enumerate(all_users):
             user.id = idx
 
+        # Every user returned here is enabled in AD.
+        negative_username_cache.discard_many(
+            user.username for user in all_users
+        )
+
         return all_users
 
-    async def get_user_info_if_authenticated(self) -> Optional[DomainUser]:
+    @staticmethod
+    def sid_to_str(sid: bytes | str) -> str:
+        """Converts a binary objectSid/tokenGroups value to its S-1-... form."""
+        if isinstance(sid, str):
+            return sid
+        revision = sid[0]
+        sub_authority_count = sid[1]
+        authority = int.from_bytes(sid[2:8], "big")
+        sub_authorities = [
+            int.from_bytes(sid[8 + 4 * i : 12 + 4 * i], "little")
+            for i in range(sub_authority_count)
+        ]
+        return f"S-{revision}-{authority}" + "".join(
+            f"-{sub}" for sub in sub_authorities
+        )
+
+    async def _read_token_groups(self, conn, user_dn: str) -> List[str]:
         """
-        Authenticate with the instance credentials and return user info if successful.
-        Returns None if authentication fails or user not found.
+        Reads the constructed tokenGroups attribute of the user's own entry.
+        AD expands nested membership server-side, so one BASE-scope read
+        replaces a recursive memberOf walk.
         """
         try:
-            client = await self._get_connected_ldap_client()
-            async with client.connect(is_async=True, timeout=10) as conn:
-                # Search for the user entry by sAMAccountName
-                filter_exp = (
-                    f"(&(objectClass=user)(sAMAccountName={self.username}))"
+            results = await conn.search(
+                base=user_dn,
+                scope=LDAPSearchScope.BASE,
+                filter_exp="(objectClass=*)",
+                attrlist=["tokenGroups"],
+                timeout=10,
+            )
+        except LDAPError as e:
+            logger.error(f"LDAP Error reading tokenGroups for {user_dn}: {e}")
+            return []
+        if not results:
+            return []
+        return [
+            self.sid_to_str(sid) for sid in results[0].get("tokenGroups", [])
+        ]
+
+    async def get_user_info_if_authenticated(
+        self,
+    ) -> Optional[DomainUserWithGroups]:
+        """
+        Login path: bind once with the instance (user) credentials and read
+        the user's own entry and tokenGroups on that same connection.
+
+        There is no fallback to the service account; a rejected bind is a
+        failed login. Returns None if authentication fails or user not found.
+        """
+        started = time.perf_counter()
+        try:
+            _, conn = await self._connect_with_failover(
+                use_service_account=False,
+                username=self.username,
+                password=self.password,
+            )
+        except AuthenticationError as e:
+            if self.AD_ACCOUNT_DISABLED_CODE in str(e):
+                self.account_disabled = True
+                logger.warning(
+                    f"User '{self.username}' is disabled in Active Directory."
                 )
-                results = await conn.search(
-                    base=self.AD_BASE_DN,
-                    scope=LDAPSearchScope.SUB,
-                    filter_exp=filter_exp,
-                    attrlist=self.LDAP_USER_ATTRIBUTES,
-                    timeout=10,
+            else:
+                logger.warning(
+                    f"Authentication failed for user '{self.username}'."
                 )
-                if not results:
-                    logger.warning(
-                        f"User '{self.username}' authenticated but not found in directory."
-                    )
-                    return None
-                return self._parse_ldap_entry_to_domain_user(results[0])
-        except AuthenticationError:
-            logger.warning(
-                f"Authentication failed for user '{self.username}'."
+            return None
+        except Exception as e:
+            logger.error(
+                f"Error connecting to AD for user '{self.username}': {e}"
             )
             return None
+
+        try:
+            # Search for the user entry by sAMAccountName
+            filter_exp = "(&(objectClass=user)(sAMAccountName={}))".format(
+                bonsai.escape_filter_exp(self.username)
+            )
+            results = await conn.search(
+                base=self.AD_BASE_DN,
+                scope=LDAPSearchScope.SUB,
+                filter_exp=filter_exp,
+                attrlist=self.LDAP_USER_ATTRIBUTES,
+                timeout=10,
+            )
+            if not results:
+                logger.warning(
+                    f"User '{self.username}' authenticated but not found in directory."
+                )
+                return None
+            user = self._parse_ldap_entry_to_domain_user(results[0])
+            if not user:
+                return None
+            group_sids = await self._read_token_groups(
+                conn, str(results[0].dn)
+            )
+            return DomainUserWithGroups(
+                **user.model_dump(), group_sids=group_sids
+            )
         except Exception as e:
             logger.error(
                 f"Error retrieving user info for '{self.username}': {e}"
             )
             return None
+        finally:
+            conn.close()
+            logger.info(
+                f"AD login lookup for '{self.username}' took "
+                f"{(time.perf_counter() - started) * 1000:.1f} ms "
+                "on a single connection."
+            )
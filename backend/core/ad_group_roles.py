@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from typing import Dict, FrozenSet, Iterable, Optional, Set
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from db.models import AdGroupRole
+
+logger = logging.getLogger(__name__)
+
+
+class AdGroupRoleCache:
+    """
+    In-memory copy of the ``ad_group_role`` table (AD group SID -> role ids).
+
+    The table is loaded lazily on first use and dropped by ``invalidate()``
+    whenever a mapping is written, so logins never query it directly.
+    """
+
+    def __init__(self):
+        self._by_sid: Optional[Dict[str, FrozenSet[int]]] = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        """Drop the cached mapping; the next lookup reloads it."""
+        self._by_sid = None
+        logger.info("AD group-to-role mapping cache invalidated.")
+
+    async def _get_mapping(
+        self, session: AsyncSession
+    ) -> Dict[str, FrozenSet[int]]:
+        mapping = self._by_sid
+        if mapping is not None:
+            return mapping
+        async with self._lock:
+            if self._by_sid is None:
+                result = await session.execute(
+                    select(AdGroupRole.group_sid, AdGroupRole.role_id)
+                )
+                loaded: Dict[str, Set[int]] = {}
+                for group_sid, role_id in result.all():
+                    loaded.setdefault(group_sid.upper(), set()).add(role_id)
+                self._by_sid = {
+                    sid: frozenset(roles) for sid, roles in loaded.items()
+                }
+                logger.info(
+                    f"Loaded {len(self._by_sid)} AD group-to-role mapping(s)."
+                )
+            return self._by_sid
+
+    async def resolve_roles(
+        self, session: AsyncSession, group_sids: Iterable[str]
+    ) -> FrozenSet[int]:
+        """Return the role ids mapped to any of the given group SIDs."""
+        mapping = await self._get_mapping(session)
+        role_ids: Set[int] = set()
+        for sid in group_sids:
+            role_ids.update(mapping.get(sid.upper(), ()))
+        return frozenset(role_ids)
+
+
+ad_group_role_cache = AdGroupRoleCache()
@@ -0,0 +1,494 @@
+"""
+Automatic audit trail for selected models.
+
+``AuditRecorder.install`` hooks the ORM session:
+
+- ``after_flush`` diffs the new, changed and deleted instances of the
+  audited models (the session still holds their pre-flush state and
+  attribute history at that point, and new rows already have ids).
+- ``do_orm_execute`` covers bulk INSERT/UPDATE/DELETE statements, which
+  bypass the flush. Old values are read before the statement runs and new
+  values after it.
+
+Each changed row gives one ``AuditLog`` and one ``AuditLogDetail`` per
+changed column. By default they are written in the same transaction as
+the change, with one multi-row INSERT for the logs (their ids read back
+with RETURNING, or from LAST_INSERT_ID() on MySQL) and one for the
+details. When the write-behind writer runs, entries are held on the
+session, dropped with any savepoint or transaction that rolls back, and
+queued on commit for a background task to write in batches.
+
+Writing entries also takes the ``audit_snapshot`` rows that bound
+point-in-time reconstruction (see ``core.audit_replay``).
+
+The acting account comes from ``audit_actor``, set when a request is
+authenticated (``core.dependencies.resolve_audit_actor`` on the CRUD
+writes). Changes with no known actor are recorded with a NULL
+``changed_by``; the row's ``updated_by`` is client input and not trusted.
+
+Time spent in the hooks is summed per transaction and logged when it
+exceeds ``AUDIT_OVERHEAD_BUDGET_MS``.
+"""
+
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import event, func, insert, inspect, select, tuple_
+from sqlalchemy.orm import Session
+
+from config import settings
+from core.audit_replay import take_snapshots
+from db.audit_encoding import audit_names, encode_delta
+from db.models import (
+    Account,
+    AuditLog,
+    AuditLogDetail,
+    Branch,
+    BranchUnit,
+    Role,
+    RolePagePermission,
+    cairo_tz,
+)
+
+logger = logging.getLogger(__name__)
+
+# Account id of the user behind the current request.
+audit_actor: ContextVar[Optional[int]] = ContextVar(
+    "audit_actor", default=None
+)
+
+
+def stamp_actor(model, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Set ``updated_by`` of write data to the authenticated actor."""
+    actor = audit_actor.get()
+    if actor is not None and "updated_by" in model.__table__.c:
+        data["updated_by"] = actor
+    return data
+
+
+AUDITED_MODELS = (Account, Role, RolePagePermission, Branch, BranchUnit)
+IGNORED_COLUMNS = {"created_at", "updated_at"}
+REDACTED_COLUMNS = {"password"}
+REDACTED = "[redacted]"
+
+# Columns telling apart the new rows of a bulk INSERT that has no
+# RETURNING, for the models written that way.
+INSERT_KEYS = {RolePagePermission: ("role_id", "page_id")}
+
+# session.info keys
+_PENDING = "audit_pending"
+_SECONDS = "audit_seconds"
+
+
+@dataclass
+class AuditEntry:
+    table_name: str
+    record_id: int
+    operation: str
+    changed_at: datetime
+    changed_by: Optional[int]
+    # (column, old value, new value)
+    details: List[Tuple[str, Optional[str], Optional[str]]]
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _detail(column: str, old: Any, new: Any):
+    if column in REDACTED_COLUMNS:
+        return (
+            column,
+            None if old is None else REDACTED,
+            None if new is None else REDACTED,
+        )
+    return (column, _text(old), _text(new))
+
+
+def inserted_ids(result) -> List[int]:
+    """
+    Ids of the rows of one multi-row INSERT ... VALUES on MySQL, which has
+    no RETURNING: LAST_INSERT_ID() is the first, and InnoDB hands a simple
+    INSERT one contiguous run (with auto_increment_increment at 1).
+    """
+    first = result.lastrowid
+    return list(range(first, first + result.rowcount))
+
+
+def write_entries(connection, entries: List[AuditEntry]) -> None:
+    """INSERT the logs and their details on a sync ``connection``."""
+    logs = AuditLog.__table__
+    audit_names.ensure(
+        connection,
+        {entry.table_name for entry in entries}
+        | {entry.operation for entry in entries}
+        | {column for entry in entries for column, _, _ in entry.details},
+    )
+    rows = [
+        {
+            "table_name": entry.table_name,
+            "record_id": entry.record_id,
+            "operation": entry.operation,
+            "changed_at": entry.changed_at,
+            "changed_by": entry.changed_by,
+        }
+        for entry in entries
+    ]
+    if connection.dialect.insert_returning:
+        result = connection.execute(
+            insert(logs).returning(logs.c.id, sort_by_parameter_order=True),
+            rows,
+        )
+        ids = list(result.scalars())
+    else:
+        ids = inserted_ids(connection.execute(insert(logs).values(rows)))
+    details = [
+        {
+            "audit_log_id": id,
+            "column_name": column,
+            "old_value": old,
+            "new_value": encode_delta(old, new) or new,
+        }
+        for id, entry in zip(ids, entries)
+        for column, old, new in entry.details
+    ]
+    if details:
+        connection.execute(insert(AuditLogDetail.__table__), details)
+    take_snapshots(
+        connection, [(entry.table_name, entry.record_id) for entry in entries]
+    )
+
+
+def _within(transaction, ancestor) -> bool:
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+class AuditRecorder:
+    def __init__(self, models=AUDITED_MODELS):
+        # model -> audited column keys
+        self._columns: Dict[type, List[str]] = {
+            model: [
+                column.key
+                for column in model.__table__.columns
+                if column.key not in IGNORED_COLUMNS
+            ]
+            for model in models
+        }
+        self._queue: Optional[asyncio.Queue] = None
+        self._installed = False
+
+    def install(self) -> None:
+        if self._installed:
+            return
+        event.listen(Session, "after_flush", self._after_flush)
+        event.listen(Session, "do_orm_execute", self._on_orm_execute)
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_soft_rollback", self._after_rollback)
+        event.listen(
+            Session, "after_transaction_end", self._after_transaction_end
+        )
+        self._installed = True
+        logger.info(
+            "Auditing " + ", ".join(model.__name__ for model in self._columns)
+        )
+
+    # --- Building entries ---
+
+    def _entry(
+        self, model, values: Mapping, operation: str, changed_at, details
+    ) -> Optional[AuditEntry]:
+        if not details:
+            return None
+        return AuditEntry(
+            table_name=model.__tablename__,
+            record_id=values["id"],
+            operation=operation,
+            changed_at=changed_at,
+            changed_by=audit_actor.get(),
+            details=details,
+        )
+
+    def _row_entry(
+        self, model, old: Optional[Mapping], new: Optional[Mapping], when
+    ) -> Optional[AuditEntry]:
+        """Entry for a row given its old and/or new column values."""
+        columns = self._columns[model]
+        if old is None:
+            operation, values = "INSERT", new
+            details = [
+                _detail(key, None, new[key])
+                for key in columns
+                if new.get(key) is not None
+            ]
+        elif new is None:
+            operation, values = "DELETE", old
+            details = [
+                _detail(key, old[key], None)
+                for key in columns
+                if old.get(key) is not None
+            ]
+        else:
+            operation, values = "UPDATE", new
+            details = [
+                _detail(key, old.get(key), new.get(key))
+                for key in columns
+                if old.get(key) != new.get(key)
+            ]
+        return self._entry(model, values, operation, when, details)
+
+    def _updated_entry(self, obj, when) -> Optional[AuditEntry]:
+        model = type(obj)
+        state = inspect(obj)
+        details = []
+        for key in self._columns[model]:
+            history = state.attrs[key].history
+            if not history.has_changes():
+                continue
+            old = history.deleted[0] if history.deleted else None
+            new = history.added[0] if history.added else None
+            if old != new:
+                details.append(_detail(key, old, new))
+        return self._entry(model, state.dict, "UPDATE", when, details)
+
+    # --- Session hooks ---
+
+    def _after_flush(self, session: Session, flush_context) -> None:
+        start = time.perf_counter()
+        when = datetime.now(cairo_tz)
+        entries = []
+        for obj in session.new:
+            if type(obj) in self._columns:
+                # Read the instance dict: attributes are not reloaded here.
+                entries.append(
+                    self._row_entry(type(obj), None, inspect(obj).dict, when)
+                )
+        for obj in session.dirty:
+            if type(obj) in self._columns:
+                entries.append(self._updated_entry(obj, when))
+        for obj in session.deleted:
+            if type(obj) in self._columns:
+                entries.append(
+                    self._row_entry(type(obj), inspect(obj).dict, None, when)
+                )
+        self._record(session, [entry for entry in entries if entry])
+        self._spent(session, start)
+
+    def _on_orm_execute(self, state):
+        if not (state.is_insert or state.is_update or state.is_delete):
+            return None
+        mapper = state.bind_mapper
+        model = mapper.class_ if mapper is not None else None
+        if model not in self._columns:
+            return None
+        start = time.perf_counter()
+        session = state.session
+        connection = session.connection()
+        table = model.__table__
+        when = datetime.now(cairo_tz)
+        entries = []
+
+        if state.is_insert and not state.statement.exported_columns:
+            result, rows = self._insert_reading_back(state, connection, model)
+            if rows is None:
+                logger.warning(
+                    f"Bulk insert into {table.name} returned no ids, "
+                    "not audited"
+                )
+            for row in rows or ():
+                entries.append(self._row_entry(model, None, row, when))
+        elif state.is_insert:
+            result = state.invoke_statement()
+            frozen = result.freeze()
+            rows = frozen().mappings().all()
+            parameters = state.parameters
+            if isinstance(parameters, dict):
+                parameters = [parameters]
+            for row, values in zip(rows, parameters):
+                entries.append(
+                    self._row_entry(model, None, {**values, **row}, when)
+                )
+            result = frozen()
+        else:
+            where = state.statement.whereclause
+            query = select(table)
+            if where is not None:
+                query = query.where(where)
+            elif isinstance(state.parameters, list):
+                # ORM bulk UPDATE by primary key: one row per parameter set.
+                query = query.where(
+                    table.c.id.in_(
+                        [values["id"] for values in state.parameters]
+                    )
+                )
+            old_rows = {
+                row["id"]: row
+                for row in connection.execute(query).mappings().all()
+            }
+            result = state.invoke_statement()
+            if state.is_update and old_rows:
+                new_rows = connection.execute(
+                    select(table).where(table.c.id.in_(list(old_rows)))
+                ).mappings()
+                for new in new_rows:
+                    entries.append(
+                        self._row_entry(model, old_rows[new["id"]], new, when)
+                    )
+            elif state.is_delete:
+                for old in old_rows.values():
+                    entries.append(self._row_entry(model, old, None, when))
+        self._record(session, [entry for entry in entries if entry])
+        self._spent(session, start)
+        return result
+
+    def _insert_reading_back(self, state, connection, model):
+        """
+        Run a bulk INSERT that has no RETURNING and read the new rows back:
+        by ``INSERT_KEYS`` among the ids past the previous highest for
+        parameter lists, by ``inserted_ids`` for one multi-row INSERT on a
+        database without RETURNING. The rows are None when neither applies.
+        """
+        table = model.__table__
+        parameters = state.parameters
+        if isinstance(parameters, dict):
+            parameters = [parameters] if parameters else []
+        keys = INSERT_KEYS.get(model)
+        if (
+            parameters
+            and keys
+            and all(key in values for values in parameters for key in keys)
+        ):
+            last_id = connection.scalar(select(func.max(table.c.id)))
+            result = state.invoke_statement()
+            query = select(table).where(
+                tuple_(*(table.c[key] for key in keys)).in_(
+                    [
+                        tuple(values[key] for key in keys)
+                        for values in parameters
+                    ]
+                )
+            )
+            if last_id is not None:
+                query = query.where(table.c.id > last_id)
+            return result, connection.execute(query).mappings().all()
+        result = state.invoke_statement()
+        if parameters or connection.dialect.insert_returning:
+            return result, None
+        query = select(table).where(table.c.id.in_(inserted_ids(result)))
+        return result, connection.execute(query).mappings().all()
+
+    def _record(self, session: Session, entries: List[AuditEntry]) -> None:
+        if not entries:
+            return
+        if self._queue is not None:
+            # Remember the (sub)transaction so a rollback can drop them.
+            transaction = (
+                session.get_nested_transaction() or session.get_transaction()
+            )
+            session.info.setdefault(_PENDING, []).append(
+                (transaction, entries)
+            )
+        else:
+            write_entries(session.connection(), entries)
+
+    def _spent(self, session: Session, start: float) -> None:
+        session.info[_SECONDS] = (
+            session.info.get(_SECONDS, 0.0) + time.perf_counter() - start
+        )
+
+    def _after_commit(self, session: Session) -> None:
+        if session.in_nested_transaction():
+            return  # a savepoint was released
+        pending = session.info.pop(_PENDING, None)
+        if pending:
+            self._enqueue(
+                [entry for _, entries in pending for entry in entries]
+            )
+        seconds = session.info.pop(_SECONDS, 0.0)
+        if seconds * 1000 > settings.AUDIT_OVERHEAD_BUDGET_MS:
+            logger.warning(
+                f"Audit capture took {seconds * 1000:.1f} ms in one "
+                f"transaction (budget {settings.AUDIT_OVERHEAD_BUDGET_MS} ms)"
+            )
+
+    def _after_rollback(self, session: Session, previous_transaction):
+        pending = session.info.get(_PENDING)
+        if pending:
+            session.info[_PENDING] = [
+                (transaction, entries)
+                for transaction, entries in pending
+                if not _within(transaction, previous_transaction)
+            ]
+
+    def _after_transaction_end(self, session: Session, transaction) -> None:
+        if transaction.parent is None:
+            # Rolled back or closed without commit: nothing to keep.
+            session.info.pop(_PENDING, None)
+            session.info.pop(_SECONDS, None)
+
+    # --- Write-behind ---
+
+    def _enqueue(self, entries: List[AuditEntry]) -> None:
+        queue = self._queue
+        if queue is None:
+            logger.error(
+                f"Audit writer stopped, dropped {len(entries)} entries"
+            )
+            return
+        try:
+            queue.put_nowait(entries)
+        except asyncio.QueueFull:
+            logger.error(f"Audit queue full, dropped {len(entries)} entries")
+
+    async def _write_batch(self, session_factory, batch: List[AuditEntry]):
+        try:
+            async with session_factory() as session:
+                await session.run_sync(
+                    lambda sync_session: write_entries(
+                        sync_session.connection(), batch
+                    )
+                )
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Error writing {len(batch)} audit entries: {e}")
+
+    async def run_writer(self, session_factory):
+        """
+        Background task: write queued entries in batches of up to
+        ``AUDIT_WRITE_BATCH``. While it runs, audit rows are no longer
+        written in the audited transaction. Drains the queue on cancel.
+        """
+        queue = asyncio.Queue(maxsize=settings.AUDIT_QUEUE_MAX)
+        self._queue = queue
+        logger.info("Starting audit write-behind writer.")
+        try:
+            while True:
+                batch = list(await queue.get())
+                while (
+                    not queue.empty()
+                    and len(batch) < settings.AUDIT_WRITE_BATCH
+                ):
+                    batch.extend(queue.get_nowait())
+                await self._write_batch(session_factory, batch)
+        finally:
+            self._queue = None
+            batch = []
+            while not queue.empty():
+                batch.extend(queue.get_nowait())
+            if batch:
+                await self._write_batch(session_factory, batch)
+
+
+audit_recorder = AuditRecorder()
@@ -0,0 +1,140 @@
+"""
+Read API over the audit trail of an entity.
+
+``add_audit_routes`` registers on an entity router:
+
+- ``GET /{id}/history``: the record's audit logs, newest first, each with
+  its details, read through the (table_name, record_id, changed_at) index
+  with the details of the whole page in one IN query. Pages continue
+  after the (changed_at, id) of the last log via ``X-Next-Cursor``: logs
+  written in one flush share their changed_at.
+- ``GET /{id}/as-of?at=``: the record as it was at that moment, rebuilt by
+  ``core.audit_replay``.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query, Response, status
+from sqlalchemy import select
+
+from config import settings
+from core.audit_replay import reconstruct
+from core.crud import (
+    NEXT_CURSOR_HEADER,
+    Expansion,
+    children_statement,
+    embed_children,
+    keyset_after,
+)
+from core.dependencies import SessionDep
+from db.models import AuditLog, naive_local
+from db.schemas import (
+    AuditLogDetailRead,
+    AuditLogHistoryRead,
+    AuditLogRead,
+    AuditStateRead,
+)
+
+HISTORY_FIELDS = tuple(AuditLogRead.model_fields)
+DETAILS = Expansion("details", AuditLogDetailRead)
+_details_statement = children_statement(AuditLog, DETAILS)
+
+
+def _encode_cursor(row) -> str:
+    raw = json.dumps(
+        [row["changed_at"].isoformat(), row["id"]], separators=(",", ":")
+    ).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        changed_at, id = json.loads(raw)
+        return datetime.fromisoformat(changed_at), int(id)
+    except Exception:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid cursor")
+
+
+def add_audit_routes(router: APIRouter, model) -> None:
+    """Register ``/{id}/history`` and ``/{id}/as-of`` for ``model``."""
+    table_name = model.__tablename__
+    logs = AuditLog.__table__
+    history_statement = (
+        select(*(logs.c[field] for field in HISTORY_FIELDS))
+        .where(logs.c.table_name == table_name)
+        .order_by(logs.c.changed_at.desc(), logs.c.id.desc())
+    )
+
+    @router.get(
+        "/{id}/history",
+        response_model=List[AuditLogHistoryRead],
+        name=f"{table_name}_history",
+    )
+    async def history(
+        id: int,
+        response: Response,
+        session: SessionDep,
+        limit: int = Query(
+            settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX
+        ),
+        before: Optional[datetime] = Query(
+            None, description="Only logs changed before this moment"
+        ),
+        cursor: Optional[str] = Query(
+            None, description=f"{NEXT_CURSOR_HEADER} of the previous page"
+        ),
+    ):
+        statement = history_statement.where(logs.c.record_id == id)
+        if before:
+            statement = statement.where(
+                logs.c.changed_at < naive_local(before)
+            )
+        if cursor:
+            statement = statement.where(
+                keyset_after(
+                    logs.c.changed_at,
+                    logs.c.id,
+                    *_decode_cursor(cursor),
+                    descending=True,
+                )
+            )
+        # One extra row tells us whether another page exists.
+        result = await session.execute(statement.limit(limit + 1))
+        rows = result.mappings().all()
+        if len(rows) > limit:
+            response.headers[NEXT_CURSOR_HEADER] = _encode_cursor(
+                rows[limit - 1]
+            )
+        return await embed_children(
+            session,
+            HISTORY_FIELDS,
+            {DETAILS.relationship: _details_statement},
+            rows[:limit],
+        )
+
+    @router.get(
+        "/{id}/as-of",
+        response_model=AuditStateRead,
+        name=f"{table_name}_as_of",
+    )
+    async def as_of(
+        id: int,
+        session: SessionDep,
+        at: datetime = Query(..., description="Naive times are Cairo time"),
+    ):
+        at = naive_local(at)
+        state = await session.run_sync(
+            lambda sync_session: reconstruct(
+                sync_session.connection(), table_name, id, at
+            )
+        )
+        if state is None:
+            raise HTTPException(
+                status.HTTP_404_NOT_FOUND,
+                f"No audit history for {table_name} {id} at {at}",
+            )
+        return state
@@ -0,0 +1,178 @@
+"""
+Point-in-time reconstruction of audited records (served by
+``core.audit_history``).
+
+``reconstruct`` rebuilds a record as it was at a moment: it starts from the
+latest ``audit_snapshot`` of the record taken at or before that moment and
+replays the audit logs written after it, read through the (table_name,
+record_id, changed_at) indexes. ``write_entries`` calls ``take_snapshots``,
+which gives a record a full snapshot once ``AUDIT_SNAPSHOT_INTERVAL``
+changes have piled up since its last one, so a reconstruction replays at
+most about that many changes whatever the length of the history.
+
+Values are in their audit text form ("True", ISO timestamps, "[redacted]"
+passwords). A record created before auditing started only has the columns
+changed since.
+"""
+
+import json
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import and_, func, insert, select, tuple_
+
+from config import settings
+from db.audit_encoding import resolve_delta
+from db.models import AuditLog, AuditLogDetail, AuditSnapshot
+from db.schemas import AuditStateRead
+
+
+def _latest_snapshot(
+    connection, table_name: str, record_id: int, as_of: Optional[datetime]
+):
+    snapshots = AuditSnapshot.__table__
+    query = select(
+        snapshots.c.audit_log_id, snapshots.c.changed_at, snapshots.c.state
+    ).where(
+        snapshots.c.table_name == table_name,
+        snapshots.c.record_id == record_id,
+    )
+    if as_of is not None:
+        query = query.where(snapshots.c.changed_at <= as_of)
+    query = query.order_by(
+        snapshots.c.changed_at.desc(), snapshots.c.audit_log_id.desc()
+    ).limit(1)
+    return connection.execute(query).first()
+
+
+def reconstruct(
+    connection,
+    table_name: str,
+    record_id: int,
+    as_of: Optional[datetime] = None,
+) -> Optional[AuditStateRead]:
+    """
+    The record as of ``as_of`` (its latest state when None), or None when
+    the audit trail has nothing on it up to then.
+    """
+    logs = AuditLog.__table__
+    details = AuditLogDetail.__table__
+    state = AuditStateRead(
+        table_name=table_name,
+        record_id=record_id,
+        as_of=as_of,
+        exists=False,
+        values={},
+    )
+    query = (
+        select(
+            logs.c.id,
+            logs.c.operation,
+            logs.c.changed_at,
+            details.c.column_name,
+            details.c.old_value,
+            details.c.new_value,
+        )
+        .select_from(
+            logs.outerjoin(details, details.c.audit_log_id == logs.c.id)
+        )
+        .where(logs.c.table_name == table_name, logs.c.record_id == record_id)
+        .order_by(logs.c.changed_at, logs.c.id)
+    )
+    snapshot = _latest_snapshot(connection, table_name, record_id, as_of)
+    if snapshot is not None:
+        state.values = json.loads(snapshot.state)
+        state.exists = True
+        state.audit_log_id = snapshot.audit_log_id
+        state.changed_at = snapshot.changed_at
+        # changed_at bounds the index range; the id skips what the
+        # snapshot already holds.
+        query = query.where(
+            logs.c.changed_at >= snapshot.changed_at,
+            logs.c.id > snapshot.audit_log_id,
+        )
+    if as_of is not None:
+        query = query.where(logs.c.changed_at <= as_of)
+
+    for row in connection.execute(query):
+        if row.id != state.audit_log_id:
+            state.audit_log_id = row.id
+            state.changed_at = row.changed_at
+            state.replayed += 1
+            if row.operation == "INSERT":
+                state.values = {}
+            state.exists = row.operation != "DELETE"
+        if row.column_name is None or not state.exists:
+            continue
+        detail = resolve_delta(
+            {"old_value": row.old_value, "new_value": row.new_value}
+        )
+        state.values[row.column_name] = detail["new_value"]
+    if not state.exists:
+        state.values = {}
+    return state if state.audit_log_id is not None else None
+
+
+def take_snapshots(
+    connection,
+    records: Iterable[Tuple[str, int]],
+    interval: Optional[int] = None,
+) -> int:
+    """
+    Snapshot those of ``records`` (table name, record id) with at least
+    ``interval`` audit logs since their last snapshot. Returns the count.
+    """
+    if interval is None:
+        interval = settings.AUDIT_SNAPSHOT_INTERVAL
+    records = list(set(records))
+    if not interval or not records:
+        return 0
+    logs = AuditLog.__table__
+    snapshots = AuditSnapshot.__table__
+    last = (
+        select(
+            snapshots.c.table_name,
+            snapshots.c.record_id,
+            func.max(snapshots.c.audit_log_id).label("audit_log_id"),
+        )
+        .where(
+            tuple_(snapshots.c.table_name, snapshots.c.record_id).in_(records)
+        )
+        .group_by(snapshots.c.table_name, snapshots.c.record_id)
+        .subquery()
+    )
+    due = connection.execute(
+        select(logs.c.table_name, logs.c.record_id)
+        .select_from(
+            logs.outerjoin(
+                last,
+                and_(
+                    last.c.table_name == logs.c.table_name,
+                    last.c.record_id == logs.c.record_id,
+                ),
+            )
+        )
+        .where(
+            tuple_(logs.c.table_name, logs.c.record_id).in_(records),
+            logs.c.id > func.coalesce(last.c.audit_log_id, 0),
+        )
+        .group_by(logs.c.table_name, logs.c.record_id)
+        .having(func.count() >= interval)
+    ).all()
+    rows = []
+    for table_name, record_id in due:
+        state = reconstruct(connection, table_name, record_id)
+        if state is None or not state.exists:
+            continue  # deleted records are not read back often enough
+        rows.append(
+            {
+                "table_name": table_name,
+                "record_id": record_id,
+                "audit_log_id": state.audit_log_id,
+                "changed_at": state.changed_at,
+                "state": json.dumps(state.values, separators=(",", ":")),
+            }
+        )
+    if rows:
+        connection.execute(insert(snapshots), rows)
+    return len(rows)
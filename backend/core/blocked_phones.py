@@ -0,0 +1,203 @@
+"""
+Process-local set of blocked phone numbers.
+
+``blocked_phones`` answers "is this number blocked?" for admission checks
+(``GET /phones/check``) without touching MySQL. It is loaded at startup,
+updated by the phone router's writes and by the login monitor's
+auto-blocking, and rebuilt every ``BLOCKED_PHONES_RELOAD_SECONDS`` to pick
+up other processes' writes.
+
+Numbers are compared normalized (``normalize_phone_number``): digits
+only, with the international prefix of ``PHONE_COUNTRY_CODE`` turned into
+the national trunk 0, so "+20 10-1234-5678" matches "01012345678". The
+phone router stores numbers normalized too.
+
+With ``BLOCKED_PHONES_BLOOM`` the numbers are held in a bloom filter of
+about 1.44 * log2(1 / error rate) bits each instead of a set (roughly 15
+bits at 0.1% instead of ~100 bytes). A miss is definite; a hit may be a
+false positive (or a number unblocked since the last rebuild, as a bloom
+filter cannot forget) and is confirmed by an indexed lookup.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from db.database import AsyncSessionLocal
+from db.models import Phone
+
+logger = logging.getLogger(__name__)
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_phone_number(number: Optional[str]) -> str:
+    number = number or ""
+    digits = _NON_DIGITS.sub("", number)
+    country = settings.PHONE_COUNTRY_CODE
+    if digits.startswith("00"):
+        digits = digits[2:]
+    elif not number.lstrip().startswith("+"):
+        return digits
+    if country and digits.startswith(country):
+        return "0" + digits[len(country) :]
+    return "00" + digits
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings (double hashing, blake2b)."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        self.size = max(int(math.ceil(bits)), 64)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+class BlockedPhones:
+    def __init__(self, bloom: bool, error_rate: float):
+        self.bloom = bloom
+        self.error_rate = error_rate
+        # Set mode: number per blocked phone id, and phones per number
+        # (phone_number is not unique).
+        self._by_id: Dict[int, str] = {}
+        self._numbers: Counter = Counter()
+        self._filter: Optional[BloomFilter] = None
+
+    def _build(self, rows: Iterable) -> None:
+        by_id = {id: normalize_phone_number(number) for id, number in rows}
+        if self.bloom:
+            # Headroom for numbers blocked before the next rebuild.
+            bloom = BloomFilter(max(2 * len(by_id), 1024), self.error_rate)
+            for number in by_id.values():
+                bloom.add(number)
+            self._filter, self._by_id, self._numbers = bloom, {}, Counter()
+            logger.info(
+                f"Loaded {len(by_id)} blocked phones into a "
+                f"{bloom.nbytes}-byte bloom filter"
+            )
+        else:
+            self._by_id = by_id
+            self._numbers = Counter(by_id.values())
+            self._filter = None
+            logger.info(f"Loaded {len(by_id)} blocked phones")
+
+    async def load(self, session: AsyncSession) -> None:
+        """Full rebuild from the database (startup and reloads)."""
+        table = Phone.__table__
+        result = await session.execute(
+            select(table.c.id, table.c.phone_number).where(table.c.is_blocked)
+        )
+        self._build(result.all())
+
+    def _discard_id(self, id: int) -> None:
+        number = self._by_id.pop(id, None)
+        if number is not None:
+            self._numbers[number] -= 1
+            if self._numbers[number] <= 0:
+                del self._numbers[number]
+
+    def update(self, id: int, number: str, is_blocked: bool) -> None:
+        """Apply a committed write to phone ``id``."""
+        number = normalize_phone_number(number)
+        if self._filter is not None:
+            # Unblocking is caught by the confirming lookup until the
+            # next rebuild.
+            if is_blocked:
+                self._filter.add(number)
+            return
+        self._discard_id(id)
+        if is_blocked:
+            self._by_id[id] = number
+            self._numbers[number] += 1
+
+    def on_write(self, phone: Phone) -> None:
+        """``CrudSpec.on_write`` hook of the phone router."""
+        deleted = sa_inspect(phone).was_deleted
+        self.update(
+            phone.id, phone.phone_number, phone.is_blocked and not deleted
+        )
+
+    async def is_blocked(self, number: str) -> bool:
+        """
+        Whether ``number`` is blocked. Only a bloom filter hit opens a
+        session and reads the database.
+        """
+        number = normalize_phone_number(number)
+        if self._filter is None:
+            return number in self._numbers
+        if number not in self._filter:
+            return False
+        table = Phone.__table__
+        async with AsyncSessionLocal() as session:
+            # Stored numbers may be formatted differently: compare
+            # normalized.
+            rows = await session.execute(
+                select(table.c.phone_number).where(
+                    table.c.is_blocked,
+                    table.c.phone_number.in_(_stored_forms(number)),
+                )
+            )
+            return any(
+                normalize_phone_number(stored) == number
+                for stored in rows.scalars()
+            )
+
+    async def run_reloads(self, session_factory, interval: float):
+        logger.info(f"Reloading blocked phones every {interval}s.")
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with session_factory() as session:
+                    await self.load(session)
+            except Exception as e:
+                logger.error(f"Blocked phones reload failed: {e}")
+
+
+def _stored_forms(number: str):
+    """Common spellings of a normalized number, for the index lookup."""
+    forms = {number}
+    country = settings.PHONE_COUNTRY_CODE
+    if country and number.startswith("0") and not number.startswith("00"):
+        forms.add("+" + country + number[1:])
+        forms.add("00" + country + number[1:])
+        forms.add(country + number[1:])
+    elif number.startswith("00"):
+        forms.add("+" + number[2:])
+    return sorted(forms)
+
+
+blocked_phones = BlockedPhones(
+    bloom=settings.BLOCKED_PHONES_BLOOM,
+    error_rate=settings.BLOCKED_PHONES_BLOOM_ERROR_RATE,
+)
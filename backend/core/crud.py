@@ -0,0 +1,847 @@
+"""
+Generic CRUD endpoints shared by the entity routers.
+
+``add_crud_routes`` registers list/read/create/update/delete endpoints for a
+``CrudSpec`` on an existing router. Everything that decides how fast those
+endpoints are lives here: statements are built once per entity, reads select
+only the Read schema's columns as plain rows (no ORM identity map), and
+responses are serialized to JSON bytes by TypeAdapters compiled at startup.
+Writes still go through the ORM session so flush-level hooks see them.
+
+List endpoints page with keyset cursors: rows are ordered by a whitelisted
+sort column plus ``id`` and each page continues strictly after the last
+row of the previous one, so page N costs the same as page 1. The body stays
+a plain JSON array; the cursor for the next page is returned in the
+``X-Next-Cursor`` header and is absent on the last page.
+
+Entities with a ``cache_control`` policy answer GETs with a strong ETag
+computed from a cheap table version (row count, MAX(updated_at) and this
+process's write counter) plus the request URL. A matching If-None-Match
+gets a 304 without the rows ever being read.
+
+``?fields=`` narrows GET responses to a whitelisted subset of Read fields;
+the SELECT and the serializer are both built for exactly that subset.
+
+``?expand=`` embeds whitelisted one-to-many relationships (e.g. an audit
+log's ``details``). The children of a whole page come from one
+``WHERE fk IN (...)`` query, the one ``selectinload`` would issue, read as
+plain rows like the parents.
+"""
+
+import base64
+import hashlib
+import inspect
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from pydantic import TypeAdapter, ValidationError, create_model
+from pydantic_core import to_jsonable_python
+from sqlalchemy import (
+    and_,
+    bindparam,
+    func,
+    inspect as sa_inspect,
+    or_,
+    select,
+)
+from sqlmodel import SQLModel
+
+from config import settings
+from core.audit import stamp_actor
+from core.crud_bulk import add_bulk_routes
+from core.dependencies import SessionDep, resolve_audit_actor
+from core.snapshots import snapshot_store
+from db.models import cairo_tz, naive_local
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# InstanceState.info key of an updated object's changed values before the
+# update, for on_write hooks.
+PREVIOUS_VALUES = "crud_previous_values"
+
+
+@dataclass(frozen=True)
+class Expansion:
+    """A one-to-many relationship GETs may embed with ``?expand=``."""
+
+    relationship: str  # relationship attribute of the model
+    read_schema: Type[SQLModel]  # schema of each embedded child
+
+
+@dataclass(frozen=True)
+class CrudSpec:
+    """Describes one entity exposed through ``add_crud_routes``."""
+
+    model: Type[SQLModel]
+    name: str  # singular label, e.g. "branch unit"
+    plural: str  # plural label, e.g. "branch units"
+    read_schema: Type[SQLModel]
+    create_schema: Type[SQLModel]
+    update_schema: Type[SQLModel]
+    # Transforms validated write data before it reaches the model
+    # (e.g. hashing a password).
+    prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+    # Called with the affected ORM object after every committed write
+    # (None after a bulk write). After an update,
+    # ``sa_inspect(obj).info[PREVIOUS_VALUES]`` holds the changed columns'
+    # values from before it.
+    on_write: Tuple[Callable[[Any], None], ...] = ()
+    # Columns list endpoints may filter on (equality).
+    filters: Tuple[str, ...] = ()
+    # Indexed columns list endpoints may sort by; ``id`` is always allowed.
+    sort_keys: Tuple[str, ...] = ()
+    # Also register POST/PUT/DELETE /bulk (see core.crud_bulk).
+    bulk: bool = False
+    # Cache-Control for GET responses; enables ETag / If-None-Match.
+    cache_control: Optional[str] = None
+    # Serve GETs from an in-memory snapshot (see core.snapshots), rebuilt
+    # after every write. Only for small reference tables.
+    snapshot: bool = False
+    # Read fields clients may pick with ?fields=; ``id`` is always returned.
+    sparse_fields: Tuple[str, ...] = ()
+    # Relationships clients may embed with ?expand=. Children are not part
+    # of the ETag version, so not combined with cache_control.
+    expand: Tuple[Expansion, ...] = ()
+
+    @property
+    def label(self) -> str:
+        return self.model.__name__
+
+    @property
+    def slug(self) -> str:
+        return self.name.lower().replace(" ", "_")
+
+    @property
+    def plural_slug(self) -> str:
+        return self.plural.lower().replace(" ", "_")
+
+
+@dataclass
+class ListQuery:
+    """Validated paging, sorting and filtering arguments of a list call."""
+
+    sort: str
+    descending: bool
+    limit: int
+    after: Optional[Tuple[Any, ...]]
+    filters: Dict[str, Any]
+
+
+class Projection:
+    """
+    Columns, statements and serializers for one set of Read fields, plus
+    the embedded relationships in ``expand``.
+    """
+
+    def __init__(
+        self,
+        table,
+        read_schema: Type[SQLModel],
+        fields,
+        expand: Tuple[Expansion, ...] = (),
+    ):
+        self.fields = fields
+        self.expand = expand
+        self.columns = [table.c[field] for field in fields]
+        self.list_statement = select(*self.columns)
+        self.get_statement = select(*self.columns).where(
+            table.c.id == bindparam("id")
+        )
+        if fields != tuple(read_schema.model_fields):
+            read_schema = create_model(
+                f"{read_schema.__name__}Fields",
+                **{
+                    field: (read_schema.model_fields[field].annotation, ...)
+                    for field in fields
+                },
+            )
+        if expand:
+            read_schema = create_model(
+                f"{read_schema.__name__}Expanded",
+                __base__=read_schema,
+                **{
+                    expansion.relationship: (List[expansion.read_schema], [])
+                    for expansion in expand
+                },
+            )
+        self.item_adapter = TypeAdapter(read_schema)
+        self.list_adapter = TypeAdapter(List[read_schema])
+
+    def dump_rows(self, rows) -> bytes:
+        return self.list_adapter.dump_json(
+            self.list_adapter.validate_python(rows)
+        )
+
+    def dump_row(self, row) -> bytes:
+        return self.item_adapter.dump_json(
+            self.item_adapter.validate_python(row)
+        )
+
+
+def children_statement(model, expansion: Expansion):
+    """
+    SELECT the Read columns of the ``expansion`` children of the parents
+    whose ids are bound to ``ids``, with the parent id as ``_parent``.
+    """
+    relationship = sa_inspect(model).relationships[expansion.relationship]
+    ((_, foreign_key),) = relationship.local_remote_pairs
+    child = relationship.mapper.local_table
+    return (
+        select(
+            foreign_key.label("_parent"),
+            *(child.c[field] for field in expansion.read_schema.model_fields),
+        )
+        .where(foreign_key.in_(bindparam("ids", expanding=True)))
+        .order_by(foreign_key, child.c.id)
+    )
+
+
+def keyset_after(column, pk, value, last_id, descending: bool = False):
+    """
+    Rows strictly after ``(value, last_id)`` in ``(column, pk)`` order,
+    spelled ``column > value OR (column = value AND pk > last_id)``: MySQL
+    gives row-constructor inequalities no index range access.
+    """
+    if descending:
+        return or_(column < value, and_(column == value, pk < last_id))
+    return or_(column > value, and_(column == value, pk > last_id))
+
+
+async def embed_children(
+    session, fields: Tuple[str, ...], statements: Dict[str, Any], rows
+) -> List[dict]:
+    """
+    ``rows`` as dicts of ``fields``, each with a list per relationship in
+    ``statements`` (see children_statement): one query per relationship.
+    """
+    items = [{field: row[field] for field in fields} for row in rows]
+    by_id = {item["id"]: item for item in items}
+    for name, statement in statements.items():
+        for item in items:
+            item[name] = []
+        if not by_id:
+            continue
+        result = await session.execute(statement, {"ids": list(by_id)})
+        for child in result.mappings():
+            by_id[child["_parent"]][name].append(child)
+    return items
+
+
+class CrudQueries:
+    """Statements and serializers built once per entity."""
+
+    def __init__(self, spec: CrudSpec):
+        model = spec.model
+        table = model.__table__
+        self.table = table
+        self.read_schema = spec.read_schema
+        self.pk = table.c.id
+        self.full = Projection(
+            table, spec.read_schema, tuple(spec.read_schema.model_fields)
+        )
+        self.columns = self.full.columns
+        self.list_statement = self.full.list_statement
+        self.get_statement = self.full.get_statement
+        self.item_adapter = self.full.item_adapter
+        self.list_adapter = self.full.list_adapter
+        # Sparse-fieldset / expanded projections, built on first use.
+        self._projections: Dict[Tuple, Projection] = {}
+        self.expansions = {
+            expansion.relationship: expansion for expansion in spec.expand
+        }
+        self.expansion_statements = {
+            expansion.relationship: children_statement(model, expansion)
+            for expansion in spec.expand
+        }
+        if spec.expand and spec.cache_control:
+            raise ValueError(f"{spec.label}: expand with cache_control")
+        self.filter_columns = {name: table.c[name] for name in spec.filters}
+        self.sort_columns = {"id": self.pk}
+        for name in spec.sort_keys:
+            if name not in spec.read_schema.model_fields:
+                raise ValueError(
+                    f"{spec.label}: sort key {name!r} is not a Read field"
+                )
+            self.sort_columns[name] = table.c[name]
+        self.sort_adapters = {
+            name: TypeAdapter(spec.read_schema.model_fields[name].annotation)
+            for name in self.sort_columns
+        }
+        self.has_updated_at = "updated_at" in table.c
+        self.version_statement = select(
+            func.count(),
+            func.max(table.c.updated_at if self.has_updated_at else self.pk),
+        ).select_from(table)
+        # Bumped on every write through this process, so two writes in the
+        # same second (DATETIME has no fraction) still change the version.
+        self.generation = 0
+
+    def projection(
+        self, fields: Optional[Tuple[str, ...]], expand: Tuple[str, ...] = ()
+    ) -> Projection:
+        if fields is None and not expand:
+            return self.full
+        key = (fields, expand)
+        projection = self._projections.get(key)
+        if projection is None:
+            projection = Projection(
+                self.table,
+                self.read_schema,
+                fields or tuple(self.read_schema.model_fields),
+                tuple(self.expansions[name] for name in expand),
+            )
+            self._projections[key] = projection
+        return projection
+
+    # --- conditional GET -------------------------------------------------
+
+    async def etag(self, session, request: Request) -> str:
+        version = (await session.execute(self.version_statement)).one()
+        return self.etag_for(version, request)
+
+    def etag_for(self, version, request: Request) -> str:
+        count, last_update = version
+        digest = hashlib.blake2b(digest_size=12)
+        digest.update(
+            f"{count}|{last_update}|{self.generation}|{request.url.path}|"
+            f"{sorted(request.query_params.multi_items())}".encode("utf-8")
+        )
+        return f'"{digest.hexdigest()}"'
+
+    # --- keyset paging ---------------------------------------------------
+
+    def encode_cursor(self, query: ListQuery, row) -> str:
+        key = (
+            [row[query.sort]]
+            if query.sort == "id"
+            else [row[query.sort], row["id"]]
+        )
+        raw = json.dumps(
+            [query.sort, query.descending, to_jsonable_python(key)],
+            separators=(",", ":"),
+        ).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+    def decode_cursor(
+        self, cursor: str, sort: str, descending: bool
+    ) -> Tuple[Any, ...]:
+        """Inverse of encode_cursor; raises ValueError on anything foreign."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            cursor_sort, cursor_descending, key = json.loads(raw)
+            if (cursor_sort, cursor_descending) != (sort, descending):
+                raise ValueError("cursor was issued for another sort order")
+            if sort == "id":
+                (last_id,) = key
+                return (self.sort_adapters["id"].validate_python(last_id),)
+            last_value, last_id = key
+            return (
+                self.sort_adapters[sort].validate_python(last_value),
+                self.sort_adapters["id"].validate_python(last_id),
+            )
+        except (TypeError, ValueError, ValidationError) as e:
+            raise ValueError(f"Invalid cursor: {e}") from e
+
+    def page_statement(self, query: ListQuery, projection: Projection):
+        column = self.sort_columns[query.sort]
+        statement = projection.list_statement
+        if query.sort not in projection.fields:
+            # The cursor needs the sort value even when it is not returned.
+            statement = statement.add_columns(column)
+        statement = statement.where(
+            *(
+                self.filter_columns[name] == value
+                for name, value in query.filters.items()
+            )
+        )
+        if query.sort == "id":
+            order_by = [self.pk.desc() if query.descending else self.pk]
+            if query.after:
+                (after,) = query.after
+                statement = statement.where(
+                    self.pk < after if query.descending else self.pk > after
+                )
+        else:
+            order_by = (
+                [column.desc(), self.pk.desc()]
+                if query.descending
+                else [column, self.pk]
+            )
+            if query.after:
+                statement = statement.where(
+                    keyset_after(
+                        column, self.pk, *query.after, query.descending
+                    )
+                )
+        # One extra row tells us whether another page exists.
+        return statement.order_by(*order_by).limit(query.limit + 1)
+
+    def page_rows(self, rows, query: ListQuery) -> list:
+        """page_statement over rows already in memory (snapshots)."""
+        sort = query.sort
+
+        def key(row):
+            return (row["id"],) if sort == "id" else (row[sort], row["id"])
+
+        if query.filters:
+            rows = [
+                row
+                for row in rows
+                if all(row[k] == v for k, v in query.filters.items())
+            ]
+        rows = sorted(rows, key=key, reverse=query.descending)
+        if query.after and query.descending:
+            rows = [row for row in rows if key(row) < query.after]
+        elif query.after:
+            rows = [row for row in rows if key(row) > query.after]
+        return rows[: query.limit + 1]
+
+    def dump_object(self, obj) -> bytes:
+        # In-memory timestamps may still be aware: dump them naive, the way
+        # reads return them.
+        row = {
+            field: naive_local(value) if isinstance(value, datetime) else value
+            for field, value in (
+                (field, getattr(obj, field)) for field in self.full.fields
+            )
+        }
+        return self.full.dump_row(row)
+
+
+def json_response(
+    body: bytes, status_code: int = 200, headers: Optional[dict] = None
+) -> Response:
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag
+        for tag in if_none_match.split(",")
+    )
+
+
+def fields_dependency(spec: CrudSpec):
+    """
+    Build the dependency parsing ``?fields=a,b`` against the entity's
+    ``sparse_fields``. It returns the Read fields to select, in schema
+    order with ``id`` first, or None for the full representation.
+    """
+    read_fields = list(spec.read_schema.model_fields)
+    allowed = set(spec.sparse_fields)
+    if not allowed:
+        return lambda: None
+    if allowed - set(read_fields):
+        raise ValueError(
+            f"{spec.label}: sparse fields {sorted(allowed - set(read_fields))}"
+            " are not Read fields"
+        )
+
+    def selected_fields(
+        fields: Optional[str] = Query(
+            None,
+            description="Comma-separated subset of: "
+            + ", ".join(spec.sparse_fields),
+        )
+    ) -> Optional[Tuple[str, ...]]:
+        if not fields:
+            return None
+        requested = {name.strip() for name in fields.split(",")} - {""}
+        unknown = requested - allowed - {"id"}
+        if unknown:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                f"Unknown field(s) {sorted(unknown)}; "
+                f"allowed: {sorted(allowed)}",
+            )
+        return tuple(
+            name for name in read_fields if name == "id" or name in requested
+        )
+
+    return selected_fields
+
+
+def expand_dependency(spec: CrudSpec):
+    """
+    Build the dependency parsing ``?expand=a,b`` against the entity's
+    ``expand`` relationships; it returns the names in spec order.
+    """
+    allowed = [expansion.relationship for expansion in spec.expand]
+    if not allowed:
+        return lambda: ()
+
+    def selected_expansions(
+        expand: Optional[str] = Query(
+            None,
+            description="Comma-separated subset of: " + ", ".join(allowed),
+        )
+    ) -> Tuple[str, ...]:
+        if not expand:
+            return ()
+        requested = {name.strip() for name in expand.split(",")} - {""}
+        unknown = requested - set(allowed)
+        if unknown:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                f"Unknown expansion(s) {sorted(unknown)}; "
+                f"allowed: {sorted(allowed)}",
+            )
+        return tuple(name for name in allowed if name in requested)
+
+    return selected_expansions
+
+
+def list_query_dependency(spec: CrudSpec, queries: CrudQueries):
+    """
+    Build the dependency parsing ``limit``, ``cursor``, ``sort`` and the
+    entity's whitelisted filters. Its signature is generated so every
+    filter shows up as a typed query parameter in OpenAPI.
+    """
+    sort_options = []
+    for name in queries.sort_columns:
+        sort_options += [name, f"-{name}"]
+    filter_names = list(queries.filter_columns)
+
+    def list_query(**params) -> ListQuery:
+        sort = params.pop("sort")
+        limit = params.pop("limit")
+        cursor = params.pop("cursor")
+        descending = sort.startswith("-")
+        sort = sort.lstrip("-")
+        after = None
+        if cursor:
+            try:
+                after = queries.decode_cursor(cursor, sort, descending)
+            except ValueError as e:
+                raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+        return ListQuery(
+            sort=sort,
+            descending=descending,
+            limit=limit,
+            after=after,
+            filters={
+                name: value
+                for name, value in params.items()
+                if value is not None
+            },
+        )
+
+    parameters = [
+        inspect.Parameter(
+            "limit",
+            inspect.Parameter.KEYWORD_ONLY,
+            annotation=int,
+            default=Query(
+                settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX
+            ),
+        ),
+        inspect.Parameter(
+            "cursor",
+            inspect.Parameter.KEYWORD_ONLY,
+            annotation=Optional[str],
+            default=Query(
+                None,
+                description=f"{NEXT_CURSOR_HEADER} of the previous page",
+            ),
+        ),
+        inspect.Parameter(
+            "sort",
+            inspect.Parameter.KEYWORD_ONLY,
+            annotation=Literal[tuple(sort_options)],
+            default=Query(
+                "id", description="Sort key, prefix with - for descending"
+            ),
+        ),
+    ]
+    for name in filter_names:
+        parameters.append(
+            inspect.Parameter(
+                name,
+                inspect.Parameter.KEYWORD_ONLY,
+                annotation=Optional[spec.model.model_fields[name].annotation],
+                default=Query(None),
+            )
+        )
+    list_query.__signature__ = inspect.Signature(
+        parameters, return_annotation=ListQuery
+    )
+    return list_query
+
+
+def add_crud_routes(router: APIRouter, spec: CrudSpec) -> CrudQueries:
+    """
+    Register GET /, GET /{id}, POST /, PUT /{id} and DELETE /{id} for
+    ``spec`` on ``router``. Routes a router declares before calling this
+    take precedence over ``/{id}``.
+    """
+    logger = logging.getLogger(spec.label)
+    queries = CrudQueries(spec)
+    model = spec.model
+    not_found = f"{spec.label} not found"
+    list_query = list_query_dependency(spec, queries)
+    selected_fields = fields_dependency(spec)
+    selected_expansions = expand_dependency(spec)
+    if spec.snapshot:
+        snapshot_store.register(model, queries)
+
+    def prepare(data: Dict[str, Any]) -> Dict[str, Any]:
+        data = stamp_actor(model, data)
+        return spec.prepare(data) if spec.prepare else data
+
+    async def committed(session, obj) -> None:
+        """Run after every committed write (obj is None for bulk writes)."""
+        queries.generation += 1
+        for hook in spec.on_write:
+            hook(obj)
+        if spec.snapshot:
+            try:
+                await snapshot_store.reload(session, model)
+            except Exception as e:
+                # The periodic version check will retry.
+                logger.error(f"Error reloading {spec.label} snapshot: {e}")
+
+    def cache_headers(etag: Optional[str]) -> Optional[dict]:
+        if etag is None:
+            return None
+        return {"ETag": etag, "Cache-Control": spec.cache_control}
+
+    async def check_etag(request: Request, session, snapshot):
+        """(etag, 304 response or None); (None, None) when not cacheable."""
+        if not spec.cache_control:
+            return None, None
+        if snapshot:
+            etag = queries.etag_for(snapshot.version, request)
+        else:
+            etag = await queries.etag(session, request)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return etag, Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers=cache_headers(etag),
+            )
+        return etag, None
+
+    async def embedded(session, projection: Projection, rows):
+        """rows with the projection's relationships, when it has any."""
+        if not projection.expand:
+            return rows
+        statements = {
+            expansion.relationship: queries.expansion_statements[
+                expansion.relationship
+            ]
+            for expansion in projection.expand
+        }
+        return await embed_children(
+            session, projection.fields, statements, rows
+        )
+
+    if spec.bulk:
+        add_bulk_routes(router, spec, queries, committed)
+
+    @router.get(
+        "/",
+        response_model=List[spec.read_schema],
+        name=f"read_{spec.plural_slug}",
+    )
+    async def read_items(
+        request: Request,
+        session: SessionDep,
+        query: ListQuery = Depends(list_query),
+        fields: Optional[Tuple[str, ...]] = Depends(selected_fields),
+        expand: Tuple[str, ...] = Depends(selected_expansions),
+    ):
+        try:
+            logger.info(f"Reading {spec.plural}")
+            snapshot = snapshot_store.get(model) if spec.snapshot else None
+            etag, not_modified = await check_etag(request, session, snapshot)
+            if not_modified:
+                return not_modified
+            projection = queries.projection(fields, expand)
+            if snapshot:
+                rows = queries.page_rows(snapshot.rows, query)
+                if projection is not queries.full:
+                    body = projection.dump_rows(
+                        await embedded(
+                            session, projection, rows[: query.limit]
+                        )
+                    )
+                else:
+                    body = b"[%s]" % b",".join(
+                        snapshot.json_by_id[row["id"]]
+                        for row in rows[: query.limit]
+                    )
+            else:
+                result = await session.execute(
+                    queries.page_statement(query, projection)
+                )
+                rows = result.mappings().all()
+                body = projection.dump_rows(
+                    await embedded(session, projection, rows[: query.limit])
+                )
+            response = json_response(body, headers=cache_headers(etag))
+            if len(rows) > query.limit:
+                response.headers[NEXT_CURSOR_HEADER] = queries.encode_cursor(
+                    query, rows[query.limit - 1]
+                )
+            return response
+        except Exception as e:
+            logger.error(f"Error reading {spec.plural}: {e}")
+            raise HTTPException(500, "Internal server error")
+
+    @router.get(
+        "/{id}", response_model=spec.read_schema, name=f"read_{spec.slug}"
+    )
+    async def read_item(
+        id: int,
+        request: Request,
+        session: SessionDep,
+        fields: Optional[Tuple[str, ...]] = Depends(selected_fields),
+        expand: Tuple[str, ...] = Depends(selected_expansions),
+    ):
+        try:
+            logger.info(f"Reading {spec.name} {id}")
+            snapshot = snapshot_store.get(model) if spec.snapshot else None
+            etag, not_modified = await check_etag(request, session, snapshot)
+            if not_modified:
+                return not_modified
+            projection = queries.projection(fields, expand)
+            if snapshot and id in snapshot.json_by_id:
+                if projection is queries.full:
+                    body = snapshot.json_by_id[id]
+                else:
+                    (row,) = await embedded(
+                        session, projection, [snapshot.by_id[id]]
+                    )
+                    body = projection.dump_row(row)
+                return json_response(body, headers=cache_headers(etag))
+            # Not in the snapshot: ask the database in case the row was
+            # added by another process since the last version check.
+            result = await session.execute(
+                projection.get_statement, {"id": id}
+            )
+            row = result.mappings().first()
+            if not row:
+                logger.warning(f"{spec.label} {id} not found")
+                raise HTTPException(404, not_found)
+            (row,) = await embedded(session, projection, [row])
+            return json_response(
+                projection.dump_row(row), headers=cache_headers(etag)
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error reading {spec.name} {id}: {e}")
+            raise HTTPException(500, "Internal server error")
+
+    @router.post(
+        "/",
+        response_model=spec.read_schema,
+        status_code=status.HTTP_201_CREATED,
+        name=f"create_{spec.slug}",
+        dependencies=[Depends(resolve_audit_actor)],
+    )
+    async def create_item(
+        payload: spec.create_schema, session: SessionDep  # type: ignore
+    ):
+        try:
+            logger.info(f"Creating {spec.name}")
+            obj = model(**prepare(payload.model_dump(exclude_none=True)))
+            session.add(obj)
+            await session.commit()
+            await committed(session, obj)
+            return json_response(
+                queries.dump_object(obj), status.HTTP_201_CREATED
+            )
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error creating {spec.name}: {e}")
+            raise HTTPException(500, "Internal server error")
+
+    @router.put(
+        "/{id}",
+        response_model=spec.read_schema,
+        name=f"update_{spec.slug}",
+        dependencies=[Depends(resolve_audit_actor)],
+    )
+    async def update_item(
+        id: int,
+        payload: spec.update_schema,  # type: ignore
+        session: SessionDep,
+    ):
+        try:
+            logger.info(f"Updating {spec.name} {id}")
+            obj = await session.get(model, id)
+            if not obj:
+                logger.warning(f"{spec.label} {id} not found")
+                raise HTTPException(404, not_found)
+            changes = prepare(payload.model_dump(exclude_unset=True))
+            sa_inspect(obj).info[PREVIOUS_VALUES] = {
+                key: getattr(obj, key) for key in changes
+            }
+            for key, value in changes.items():
+                setattr(obj, key, value)
+            if queries.has_updated_at:
+                obj.updated_at = datetime.now(cairo_tz)
+            await session.commit()
+            await committed(session, obj)
+            return json_response(queries.dump_object(obj))
+        except HTTPException:
+            raise
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error updating {spec.name} {id}: {e}")
+            raise HTTPException(500, "Internal server error")
+
+    @router.delete(
+        "/{id}",
+        name=f"delete_{spec.slug}",
+        dependencies=[Depends(resolve_audit_actor)],
+    )
+    async def delete_item(id: int, session: SessionDep):
+        try:
+            logger.info(f"Deleting {spec.name} {id}")
+            obj = await session.get(model, id)
+            if not obj:
+                logger.warning(f"{spec.label} {id} not found")
+                raise HTTPException(404, not_found)
+            await session.delete(obj)
+            await session.commit()
+            await committed(session, obj)
+            return {"ok": True}
+        except HTTPException:
+            raise
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error deleting {spec.name} {id}: {e}")
+            raise HTTPException(500, "Internal server error")
+
+    return queries
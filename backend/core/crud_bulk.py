@@ -0,0 +1,354 @@
+"""
+Bulk create/update/delete endpoints for CRUD entities.
+
+``add_bulk_routes`` registers POST/PUT/DELETE ``/bulk`` on a router. Items
+are written in chunks of ``BULK_CHUNK_SIZE`` inside one transaction:
+
+- create: one multi-row INSERT per chunk, with RETURNING for the new ids
+  or, where the database has none (MySQL), the ids LAST_INSERT_ID() gives.
+- update: one UPDATE per chunk, with a ``CASE id WHEN ...`` expression
+  per column so items may set different fields.
+- delete: one ``DELETE ... WHERE id IN (...)`` per chunk.
+
+Each chunk runs in a savepoint. When a chunk fails it is replayed row by
+row in savepoints to find the failing items. In ``atomic`` mode any failure
+rolls the whole request back. In ``best_effort`` mode the failing items are
+reported and everything else is committed. The response always carries one
+result per item, in request order.
+"""
+
+import logging
+from datetime import datetime
+from typing import Annotated, Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from pydantic import Field, create_model
+from sqlalchemy import case, delete, insert, literal, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from config import settings
+from core.audit import inserted_ids, stamp_actor
+from core.dependencies import SessionDep, resolve_audit_actor
+from db.models import cairo_tz
+from db.schemas import (
+    BulkDeleteRequest,
+    BulkItemResult,
+    BulkMode,
+    BulkResult,
+)
+
+SUCCESS_STATUSES = {"created", "updated", "deleted"}
+
+
+def _chunks(items: List, size: int):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _items(schema):
+    return Annotated[
+        List[schema],
+        Field(min_length=1, max_length=settings.BULK_MAX_ITEMS),
+    ]
+
+
+def _db_error(e: Exception) -> str:
+    """The driver's message without the SQL statement and parameters."""
+    return str(getattr(e, "orig", None) or e)
+
+
+async def _write_chunked(
+    session,
+    mode: BulkMode,
+    results: List[BulkItemResult],
+    pending: List[int],
+    write_chunk: Callable[[List[int]], Awaitable[List[Optional[int]]]],
+    ok_status: str,
+    logger: logging.Logger,
+) -> None:
+    """
+    Write the items at positions ``pending`` chunk by chunk, filling in
+    ``results``. ``write_chunk`` receives item positions and returns the
+    written ids (None where the database cannot report them).
+    """
+    for chunk in _chunks(pending, settings.BULK_CHUNK_SIZE):
+        if mode == BulkMode.atomic and any(
+            r.status not in SUCCESS_STATUSES for r in results if r.status
+        ):
+            for index in chunk:
+                results[index].status = "skipped"
+            continue
+        try:
+            async with session.begin_nested():
+                ids = await write_chunk(chunk)
+        except SQLAlchemyError as e:
+            logger.warning(
+                f"Bulk chunk of {len(chunk)} failed, retrying row by row: "
+                f"{_db_error(e)}"
+            )
+            ids = None
+        if ids is not None:
+            for index, id in zip(chunk, ids):
+                results[index].status = ok_status
+                if id is not None:
+                    results[index].id = id
+            continue
+        for index in chunk:
+            try:
+                async with session.begin_nested():
+                    (id,) = await write_chunk([index])
+                results[index].status = ok_status
+                if id is not None:
+                    results[index].id = id
+            except SQLAlchemyError as e:
+                results[index].status = "failed"
+                results[index].error = _db_error(e)
+
+
+async def _finish(
+    session,
+    mode: BulkMode,
+    results: List[BulkItemResult],
+    response: Response,
+    after_commit,
+) -> BulkResult:
+    failed = sum(r.status not in SUCCESS_STATUSES for r in results)
+    committed = not (mode == BulkMode.atomic and failed)
+    if committed:
+        await session.commit()
+        await after_commit(session, None)
+    else:
+        await session.rollback()
+        response.status_code = status.HTTP_400_BAD_REQUEST
+        for result in results:
+            if result.status == "created":
+                result.id = None
+            if result.status in SUCCESS_STATUSES:
+                result.status = "rolled_back"
+    return BulkResult(
+        mode=mode,
+        committed=committed,
+        succeeded=len(results) - failed,
+        failed=failed,
+        results=results,
+    )
+
+
+def add_bulk_routes(router: APIRouter, spec, queries, after_commit) -> None:
+    """
+    Register POST, PUT and DELETE ``/bulk`` for ``spec``. Must run before
+    the ``/{id}`` routes are added so ``/bulk`` is not read as an id.
+    ``after_commit(session, None)`` is awaited after every committed write.
+    """
+    logger = logging.getLogger(spec.label)
+    model = spec.model
+    table = model.__table__
+    pk = queries.pk
+    writable = [c for c in table.columns if c is not pk]
+    create_request = create_model(
+        f"{spec.label}BulkCreate",
+        mode=(BulkMode, BulkMode.atomic),
+        items=(_items(spec.create_schema), ...),
+    )
+    update_item = create_model(
+        f"{spec.label}BulkUpdateItem",
+        __base__=spec.update_schema,
+        id=(int, ...),
+    )
+    update_request = create_model(
+        f"{spec.label}BulkUpdate",
+        mode=(BulkMode, BulkMode.atomic),
+        items=(_items(update_item), ...),
+    )
+
+    def prepare(data: Dict[str, Any]) -> Dict[str, Any]:
+        data = stamp_actor(model, data)
+        return spec.prepare(data) if spec.prepare else data
+
+    async def existing_ids(session, ids: List[int]) -> set:
+        found = set()
+        for chunk in _chunks(sorted(set(ids)), settings.BULK_CHUNK_SIZE):
+            result = await session.execute(select(pk).where(pk.in_(chunk)))
+            found.update(result.scalars())
+        return found
+
+    @router.post(
+        "/bulk",
+        response_model=BulkResult,
+        name=f"bulk_create_{spec.plural_slug}",
+        dependencies=[Depends(resolve_audit_actor)],
+    )
+    async def bulk_create(
+        request: create_request,  # type: ignore
+        response: Response,
+        session: SessionDep,
+    ):
+        logger.info(f"Bulk creating {len(request.items)} {spec.plural}")
+        results = [
+            BulkItemResult(index=i, status="")
+            for i in range(len(request.items))
+        ]
+        rows = []
+        for item in request.items:
+            obj = model(**prepare(item.model_dump(exclude_none=True)))
+            rows.append({c.key: getattr(obj, c.key) for c in writable})
+        returning = session.bind.dialect.insert_returning
+
+        async def write_chunk(positions: List[int]) -> List[Optional[int]]:
+            chunk = [rows[i] for i in positions]
+            if returning:
+                result = await session.execute(
+                    insert(model).returning(pk, sort_by_parameter_order=True),
+                    chunk,
+                )
+                return list(result.scalars())
+            result = await session.execute(insert(model).values(chunk))
+            return inserted_ids(result)
+
+        try:
+            await _write_chunked(
+                session,
+                request.mode,
+                results,
+                list(range(len(rows))),
+                write_chunk,
+                "created",
+                logger,
+            )
+            return await _finish(
+                session, request.mode, results, response, after_commit
+            )
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error bulk creating {spec.plural}: {e}")
+            raise HTTPException(500, "Internal server error")
+
+    @router.put(
+        "/bulk",
+        response_model=BulkResult,
+        name=f"bulk_update_{spec.plural_slug}",
+        dependencies=[Depends(resolve_audit_actor)],
+    )
+    async def bulk_update(
+        request: update_request,  # type: ignore
+        response: Response,
+        session: SessionDep,
+    ):
+        logger.info(f"Bulk updating {len(request.items)} {spec.plural}")
+        results = [
+            BulkItemResult(index=i, id=item.id, status="")
+            for i, item in enumerate(request.items)
+        ]
+        changes = [
+            prepare(item.model_dump(exclude_unset=True, exclude={"id"}))
+            for item in request.items
+        ]
+
+        async def write_chunk(positions: List[int]) -> List[Optional[int]]:
+            ids = [request.items[i].id for i in positions]
+            by_column: Dict[str, Dict[int, Any]] = {}
+            for i in positions:
+                for key, value in changes[i].items():
+                    by_column.setdefault(key, {})[request.items[i].id] = value
+            values = {
+                key: case(
+                    {
+                        id: literal(value, table.c[key].type)
+                        for id, value in per_id.items()
+                    },
+                    value=pk,
+                    else_=table.c[key],
+                )
+                for key, per_id in by_column.items()
+            }
+            if queries.has_updated_at:
+                values["updated_at"] = datetime.now(cairo_tz)
+            if not values:
+                return ids
+            await session.execute(
+                update(model)
+                .where(pk.in_(ids))
+                .values(values)
+                .execution_options(synchronize_session=False)
+            )
+            return ids
+
+        try:
+            found = await existing_ids(
+                session, [item.id for item in request.items]
+            )
+            pending = []
+            for result in results:
+                if result.id in found:
+                    pending.append(result.index)
+                else:
+                    result.status = "not_found"
+            await _write_chunked(
+                session,
+                request.mode,
+                results,
+                pending,
+                write_chunk,
+                "updated",
+                logger,
+            )
+            return await _finish(
+                session, request.mode, results, response, after_commit
+            )
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error bulk updating {spec.plural}: {e}")
+            raise HTTPException(500, "Internal server error")
+
+    @router.delete(
+        "/bulk",
+        response_model=BulkResult,
+        name=f"bulk_delete_{spec.plural_slug}",
+        dependencies=[Depends(resolve_audit_actor)],
+    )
+    async def bulk_delete(
+        request: BulkDeleteRequest, response: Response, session: SessionDep
+    ):
+        if len(request.ids) > settings.BULK_MAX_ITEMS:
+            raise HTTPException(
+                422, f"At most {settings.BULK_MAX_ITEMS} ids per request"
+            )
+        logger.info(f"Bulk deleting {len(request.ids)} {spec.plural}")
+        results = [
+            BulkItemResult(index=i, id=id, status="")
+            for i, id in enumerate(request.ids)
+        ]
+
+        async def write_chunk(positions: List[int]) -> List[Optional[int]]:
+            ids = [request.ids[i] for i in positions]
+            await session.execute(
+                delete(model)
+                .where(pk.in_(ids))
+                .execution_options(synchronize_session=False)
+            )
+            return ids
+
+        try:
+            found = await existing_ids(session, request.ids)
+            pending = []
+            for result in results:
+                if result.id in found:
+                    pending.append(result.index)
+                else:
+                    result.status = "not_found"
+            await _write_chunked(
+                session,
+                request.mode,
+                results,
+                pending,
+                write_chunk,
+                "deleted",
+                logger,
+            )
+            return await _finish(
+                session, request.mode, results, response, after_commit
+            )
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error bulk deleting {spec.plural}: {e}")
+            raise HTTPException(500, "Internal server error")
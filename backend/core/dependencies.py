@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, Optional
 
 import pytz
 from fastapi import Depends, HTTPException, Request
@@ -7,7 +7,9 @@ from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import settings
-from core.schema import DomainUser
+from core.audit import audit_actor
+from core.permission_matrix import ACTIONS, permission_matrix
+from core.schema import DomainUserWithRoles
 from db.database import get_application_session
 
 # Define your secret key and algorithm
@@ -38,22 +40,74 @@ async def get_current_user(request: Request):
     token = auth.split(" ", 1)[1]
     try:
         payload = await decrypt(token)
-        user = payload["user"]
+        # Access tokens issued by /login carry the claims under "account".
+        user = payload.get("account") or payload["user"]
+        request.state.permission_claim = payload.get("perm")
+        audit_actor.set(user["id"])
 
-        return DomainUser(
+        return DomainUserWithRoles(
             id=user["id"],
             username=user["username"],
             fullname=user["fullname"],
             title=user["title"],
             email=user["email"],
+            roles=user.get("roles") or [],
+            is_super_admin=user.get("is_super_admin", False),
         )
     except Exception as e:
         raise HTTPException(401, "Invalid token")
 
 
+async def resolve_audit_actor(request: Request) -> Optional[int]:
+    """
+    Optional authentication for CRUD writes: sets ``audit_actor`` from the
+    bearer token when there is one (401 if it is invalid) and clears it
+    otherwise, so changes are attributed to the caller or to no one.
+    """
+    if not request.headers.get("Authorization"):
+        audit_actor.set(None)
+        return None
+    user = await get_current_user(request)
+    return user.id
+
+
+def require_permission(page_path: str, action: str):
+    """
+    Dependency factory enforcing a page permission from the in-memory
+    matrix, using the token's "perm" bitmap when it is current and the
+    role ids carried by the access token otherwise (no DB I/O).
+    Usage: current_user = Depends(require_permission("/admin/pages", "edit"))
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown permission action: {action}")
+
+    async def check_permission(
+        request: Request,
+        current_user: DomainUserWithRoles = Depends(get_current_user),
+    ) -> DomainUserWithRoles:
+        if current_user.is_super_admin:
+            return current_user
+        allowed = None
+        claim = getattr(request.state, "permission_claim", None)
+        if claim:
+            # None means the bitmap is stale; fall back to the token roles.
+            allowed = permission_matrix.allows_from_claim(
+                claim, page_path, action
+            )
+        if allowed is None:
+            allowed = permission_matrix.allows(
+                current_user.roles or [], page_path, action
+            )
+        if allowed:
+            return current_user
+        raise HTTPException(403, "Insufficient permissions")
+
+    return check_permission
+
+
 # --- Dependency Injection Annotations ---
 
 SessionDep = Annotated[AsyncSession, Depends(get_application_session)]
 
 
-CurrentUserDep = Annotated[DomainUser, Depends(get_current_user)]
+CurrentUserDep = Annotated[DomainUserWithRoles, Depends(get_current_user)]
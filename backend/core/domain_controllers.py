@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DomainController:
+    """Health and traffic state for one domain controller."""
+
+    host: str
+    port: int
+    ewma_latency_ms: Optional[float] = None
+    consecutive_failures: int = 0
+    # time.monotonic() until which the circuit stays open (DC ejected)
+    open_until: float = 0.0
+    requests: int = 0
+    successes: int = 0
+    failures: int = 0
+    last_error: Optional[str] = None
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def is_open(self, now: float) -> bool:
+        return now < self.open_until
+
+
+class DomainControllerPool:
+    """
+    Picks the fastest healthy domain controller for each LDAP connection.
+
+    Latency is tracked as an EWMA fed by both real connections and the
+    background TCP probes. A DC that fails ``failure_threshold`` times in a
+    row is ejected for ``reset_seconds``; once that elapses it becomes a
+    candidate again and the next success closes the circuit.
+    """
+
+    def __init__(
+        self,
+        servers: List[DomainController],
+        alpha: float,
+        failure_threshold: int,
+        reset_seconds: float,
+        probe_timeout: float,
+    ):
+        self.servers = servers
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.probe_timeout = probe_timeout
+
+    @classmethod
+    def from_settings(cls) -> "DomainControllerPool":
+        entries = settings.AD_SERVERS or [settings.AD_SERVER]
+        servers = []
+        for entry in entries:
+            host, _, port = entry.strip().partition(":")
+            servers.append(
+                DomainController(
+                    host=host, port=int(port) if port else settings.AD_PORT
+                )
+            )
+        return cls(
+            servers=servers,
+            alpha=settings.AD_LATENCY_EWMA_ALPHA,
+            failure_threshold=settings.AD_CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=settings.AD_CIRCUIT_RESET_SECONDS,
+            probe_timeout=settings.AD_CONNECT_TIMEOUT_SECONDS,
+        )
+
+    def candidates(self) -> List[DomainController]:
+        """
+        Healthy DCs ordered by latency (unmeasured ones last), followed by
+        ejected DCs as a last resort so a total outage still gets retried.
+        """
+        now = time.monotonic()
+        healthy = [dc for dc in self.servers if not dc.is_open(now)]
+        ejected = [dc for dc in self.servers if dc.is_open(now)]
+        healthy.sort(
+            key=lambda dc: (
+                dc.ewma_latency_ms
+                if dc.ewma_latency_ms is not None
+                else float("inf")
+            )
+        )
+        ejected.sort(key=lambda dc: dc.open_until)
+        return healthy + ejected
+
+    def _observe_latency(self, dc: DomainController, latency_ms: float):
+        if dc.ewma_latency_ms is None:
+            dc.ewma_latency_ms = latency_ms
+        else:
+            dc.ewma_latency_ms = (
+                self.alpha * latency_ms
+                + (1 - self.alpha) * dc.ewma_latency_ms
+            )
+
+    def _mark_healthy(self, dc: DomainController, latency_ms: float):
+        self._observe_latency(dc, latency_ms)
+        if dc.open_until:
+            logger.info(f"Domain controller {dc.address} is healthy again.")
+        dc.consecutive_failures = 0
+        dc.open_until = 0.0
+        dc.last_error = None
+
+    def _mark_unhealthy(self, dc: DomainController, error: BaseException):
+        dc.consecutive_failures += 1
+        dc.last_error = str(error) or type(error).__name__
+        if dc.consecutive_failures >= self.failure_threshold:
+            dc.open_until = time.monotonic() + self.reset_seconds
+            logger.warning(
+                f"Ejecting domain controller {dc.address} for "
+                f"{self.reset_seconds}s after {dc.consecutive_failures} "
+                f"consecutive failure(s): {dc.last_error}"
+            )
+
+    def record_success(self, dc: DomainController, latency_ms: float):
+        dc.requests += 1
+        dc.successes += 1
+        self._mark_healthy(dc, latency_ms)
+
+    def record_failure(self, dc: DomainController, error: BaseException):
+        dc.requests += 1
+        dc.failures += 1
+        self._mark_unhealthy(dc, error)
+
+    async def probe(self, dc: DomainController) -> None:
+        """Measure TCP connect latency; probes do not count as traffic."""
+        started = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(dc.host, dc.port),
+                timeout=self.probe_timeout,
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            self._mark_unhealthy(dc, e)
+            return
+        self._mark_healthy(dc, (time.perf_counter() - started) * 1000)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+    async def probe_all(self) -> None:
+        await asyncio.gather(*(self.probe(dc) for dc in self.servers))
+
+    async def run_health_checks(self, interval: float) -> None:
+        logger.info(
+            f"Starting domain controller health checks every {interval}s "
+            f"for {len(self.servers)} server(s)."
+        )
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(interval)
+
+    def metrics(self) -> List[Dict]:
+        now = time.monotonic()
+        total = sum(dc.requests for dc in self.servers) or 1
+        return [
+            {
+                "address": dc.address,
+                "state": "open" if dc.is_open(now) else "closed",
+                "ewma_latency_ms": (
+                    round(dc.ewma_latency_ms, 2)
+                    if dc.ewma_latency_ms is not None
+                    else None
+                ),
+                "requests": dc.requests,
+                "successes": dc.successes,
+                "failures": dc.failures,
+                "traffic_share": round(dc.requests / total, 4),
+                "consecutive_failures": dc.consecutive_failures,
+                "last_error": dc.last_error,
+            }
+            for dc in self.servers
+        ]
+
+
+domain_controller_pool = DomainControllerPool.from_settings()
@@ -0,0 +1,205 @@
+"""
+Buffered ingestion of ``LoginLog`` events.
+
+``POST /login-logs/ingest`` puts events into ``login_log_buffer``, an
+in-process buffer of at most ``LOGIN_INGEST_BUFFER_MAX`` rows. The
+background flusher writes it with multi-row INSERTs, one transaction per
+flush, as soon as ``LOGIN_INGEST_FLUSH_ROWS`` rows are waiting or
+``LOGIN_INGEST_FLUSH_MS`` after the oldest waiting row arrived.
+
+When the buffer is full a request waits up to
+``LOGIN_INGEST_ENQUEUE_TIMEOUT_MS`` for room and is then refused
+(``BufferFull``), so producers slow down instead of memory growing.
+
+Durability (``LOGIN_INGEST_DURABILITY``, or per request):
+
+- ``accepted``: answer once the events are buffered. Events still in the
+  buffer are lost if the process dies; the flusher drains it on shutdown.
+- ``committed``: answer once the flush holding the events has committed.
+  Latency goes up by up to the flush interval, throughput stays batched.
+
+A flush that fails is retried row by row, so one bad event (e.g. an
+unknown phone_id) only loses itself. Committed rows are passed to
+``core.login_monitor``.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Deque, List, Optional
+
+from sqlalchemy import insert
+
+from config import settings
+from core.login_monitor import login_monitor
+from db.models import LoginLog, cairo_tz, naive_local
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFull(Exception):
+    pass
+
+
+class BufferClosed(Exception):
+    pass
+
+
+@dataclass
+class _Request:
+    rows: List[dict]
+    # Resolved with the number of rows written (committed durability).
+    done: Optional[asyncio.Future] = None
+
+
+class LoginLogBuffer:
+    def __init__(self):
+        self._requests: Deque[_Request] = deque()
+        self._rows = 0
+        self._changed = asyncio.Condition()
+        self._running = False
+
+    @property
+    def size(self) -> int:
+        return self._rows
+
+    @staticmethod
+    def row(event: dict, now: datetime) -> dict:
+        """
+        A complete login_log row, timestamped on arrival. A client's
+        event_time is stored as naive Cairo time, like the others.
+        """
+        event_time = event.get("event_time")
+        return {
+            "phone_id": event["phone_id"],
+            "device_ip": event["device_ip"],
+            "event_time": naive_local(event_time) if event_time else now,
+            "is_successful": event["is_successful"],
+            "result": event.get("result"),
+            "updated_at": now,
+            "updated_by": event.get("updated_by"),
+        }
+
+    async def put(self, events: List[dict], committed: bool) -> int:
+        """
+        Buffer ``events``. Returns the number of rows written when
+        ``committed``, else the number buffered.
+        """
+        if not self._running:
+            raise BufferClosed("login log ingestion is not running")
+        limit = settings.LOGIN_INGEST_BUFFER_MAX
+        if len(events) > limit:
+            raise ValueError(f"at most {limit} events per request")
+        now = datetime.now(cairo_tz)
+        request = _Request([self.row(event, now) for event in events])
+        if committed:
+            request.done = asyncio.get_running_loop().create_future()
+        async with self._changed:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(
+                        lambda: self._rows + len(events) <= limit
+                    ),
+                    settings.LOGIN_INGEST_ENQUEUE_TIMEOUT_MS / 1000,
+                )
+            except asyncio.TimeoutError:
+                raise BufferFull(f"login log buffer full ({self._rows} rows)")
+            self._requests.append(request)
+            self._rows += len(events)
+            self._changed.notify_all()
+        if request.done is None:
+            return len(events)
+        return await request.done
+
+    def _take(self) -> List[_Request]:
+        """Whole requests from the front, up to about a flush of rows."""
+        taken, rows = [], 0
+        while self._requests and rows < settings.LOGIN_INGEST_FLUSH_ROWS:
+            request = self._requests.popleft()
+            taken.append(request)
+            rows += len(request.rows)
+        self._rows -= rows
+        return taken
+
+    async def _next_batch(self) -> List[_Request]:
+        flush_rows = settings.LOGIN_INGEST_FLUSH_ROWS
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._rows > 0)
+            if self._rows < flush_rows:
+                try:
+                    await asyncio.wait_for(
+                        self._changed.wait_for(
+                            lambda: self._rows >= flush_rows
+                        ),
+                        settings.LOGIN_INGEST_FLUSH_MS / 1000,
+                    )
+                except asyncio.TimeoutError:
+                    pass
+            batch = self._take()
+            # Room was made: wake producers waiting on a full buffer.
+            self._changed.notify_all()
+            return batch
+
+    async def _write(self, session_factory, batch: List[_Request]) -> None:
+        table = LoginLog.__table__
+        rows = [row for request in batch for row in request.rows]
+        try:
+            async with session_factory() as session:
+                await session.execute(insert(table), rows)
+                await session.commit()
+            committed = rows
+            written = {id(request): len(request.rows) for request in batch}
+        except Exception as e:
+            logger.error(
+                f"Error writing {len(rows)} login logs, retrying one by "
+                f"one: {e}"
+            )
+            committed, written = [], {}
+            async with session_factory() as session:
+                for request in batch:
+                    count = 0
+                    for row in request.rows:
+                        try:
+                            await session.execute(insert(table), row)
+                            await session.commit()
+                        except Exception as e:
+                            await session.rollback()
+                            logger.error(f"Dropped login log {row}: {e}")
+                            continue
+                        committed.append(row)
+                        count += 1
+                    written[id(request)] = count
+        # Outside the write: the rows are committed whatever happens here.
+        try:
+            login_monitor.record(committed)
+        except Exception as e:
+            logger.error(f"Error counting {len(committed)} login logs: {e}")
+        for request in batch:
+            if request.done is not None and not request.done.done():
+                request.done.set_result(written[id(request)])
+
+    async def run_flusher(self, session_factory):
+        """Background task writing the buffer; drains it on cancel."""
+        logger.info("Starting login log ingestion.")
+        self._running = True
+        try:
+            while True:
+                batch = await self._next_batch()
+                write = asyncio.ensure_future(
+                    self._write(session_factory, batch)
+                )
+                try:
+                    await asyncio.shield(write)
+                except asyncio.CancelledError:
+                    # Let the flush in progress finish before draining.
+                    await write
+                    raise
+        finally:
+            self._running = False
+            while self._requests:
+                await self._write(session_factory, self._take())
+
+
+login_log_buffer = LoginLogBuffer()
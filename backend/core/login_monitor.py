@@ -0,0 +1,215 @@
+"""
+Real-time failed-login counters.
+
+``login_monitor`` counts failed ``LoginLog`` events per device IP and per
+phone over a sliding window of ``LOGIN_MONITOR_WINDOW_SECONDS``, so abuse
+shows up without scanning login_log. Each key holds a ring buffer of
+``LOGIN_MONITOR_BUCKETS`` counts; a bucket is reset when the ring comes
+back round to it, so counting and reading cost O(buckets) whatever the
+event rate. At most ``LOGIN_MONITOR_MAX_KEYS`` keys per kind are kept,
+the least recently failed evicted first.
+
+Events are counted once committed: ORM inserts through the session hooks
+installed by ``install``, ingested batches by ``core.login_ingest``. The
+counters are per process and start empty.
+
+With ``LOGIN_MONITOR_BLOCK_THRESHOLD`` set, a phone reaching that many
+failures in the window is queued, and ``run_blocker`` sets its
+``Phone.is_blocked`` and adds it to ``core.blocked_phones``. Device IPs
+are reported by ``top`` only: several phones can sit behind one IP.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session
+
+from config import settings
+from core.blocked_phones import blocked_phones
+from db.models import LoginLog, Phone, cairo_tz
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("device_ip", "phone_id")
+_PENDING = "login_monitor_pending"
+
+
+class SlidingCounter:
+    """Event count over the last ``len(counts)`` buckets of time."""
+
+    __slots__ = ("counts", "slots")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        # Absolute bucket number each slot currently counts.
+        self.slots = [-1] * buckets
+
+    def add(self, bucket: int, count: int = 1) -> None:
+        index = bucket % len(self.counts)
+        if self.slots[index] != bucket:
+            self.slots[index] = bucket
+            self.counts[index] = 0
+        self.counts[index] += count
+
+    def total(self, bucket: int) -> int:
+        oldest = bucket - len(self.counts)
+        return sum(
+            count
+            for count, slot in zip(self.counts, self.slots)
+            if slot > oldest
+        )
+
+
+class FailedLoginMonitor:
+    def __init__(
+        self,
+        window_seconds: float,
+        buckets: int,
+        max_keys: int,
+        block_threshold: int,
+    ):
+        self.window_seconds = window_seconds
+        self.buckets = buckets
+        self.max_keys = max_keys
+        self.block_threshold = block_threshold
+        self._bucket_seconds = window_seconds / buckets
+        self._counters: Dict[str, "OrderedDict[object, SlidingCounter]"] = {
+            kind: OrderedDict() for kind in KINDS
+        }
+        self._to_block: Set[int] = set()
+        self._block_requested = asyncio.Event()
+        self._installed = False
+
+    def _bucket(self) -> int:
+        return int(time.monotonic() / self._bucket_seconds)
+
+    def _count(self, kind: str, key, bucket: int) -> int:
+        counters = self._counters[kind]
+        counter = counters.get(key)
+        if counter is None:
+            counter = counters[key] = SlidingCounter(self.buckets)
+            while len(counters) > self.max_keys:
+                counters.popitem(last=False)
+        else:
+            counters.move_to_end(key)
+        counter.add(bucket)
+        return counter.total(bucket)
+
+    def record(self, rows: Iterable[dict]) -> None:
+        """Count the failed events among committed login log rows."""
+        bucket = self._bucket()
+        for row in rows:
+            if row["is_successful"]:
+                continue
+            self._count("device_ip", row["device_ip"], bucket)
+            failures = self._count("phone_id", row["phone_id"], bucket)
+            if self.block_threshold and failures >= self.block_threshold:
+                self._to_block.add(row["phone_id"])
+                self._block_requested.set()
+
+    def top(self, kind: str, limit: int) -> List[Tuple[object, int]]:
+        """The ``limit`` keys of ``kind`` with the most failures."""
+        bucket = self._bucket()
+        totals = (
+            (key, counter.total(bucket))
+            for key, counter in self._counters[kind].items()
+        )
+        return [
+            (key, failures)
+            for key, failures in heapq.nlargest(
+                limit, totals, key=lambda item: item[1]
+            )
+            if failures
+        ]
+
+    def clear(self) -> None:
+        for counters in self._counters.values():
+            counters.clear()
+        self._to_block.clear()
+
+    # --- Session hooks ---
+
+    def install(self) -> None:
+        if self._installed:
+            return
+        event.listen(Session, "after_flush", self._after_flush)
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_soft_rollback", self._after_rollback)
+        self._installed = True
+
+    def _after_flush(self, session: Session, flush_context) -> None:
+        # Copied now: attributes are expired by the commit.
+        new = [
+            {key: state.dict.get(key) for key in KINDS + ("is_successful",)}
+            for state in map(inspect, session.new)
+            if isinstance(state.obj(), LoginLog)
+        ]
+        if new:
+            session.info.setdefault(_PENDING, []).extend(new)
+
+    def _after_commit(self, session: Session) -> None:
+        pending = session.info.pop(_PENDING, None)
+        if pending:
+            self.record(pending)
+
+    def _after_rollback(self, session: Session, previous_transaction) -> None:
+        session.info.pop(_PENDING, None)
+
+    # --- Auto-blocking ---
+
+    async def _block(self, session_factory, phone_ids: List[int]) -> None:
+        table = Phone.__table__
+        async with session_factory() as session:
+            result = await session.execute(
+                update(table)
+                .where(
+                    table.c.id.in_(phone_ids), table.c.is_blocked.is_(False)
+                )
+                .values(is_blocked=True, updated_at=datetime.now(cairo_tz))
+            )
+            await session.commit()
+            blocked = await session.execute(
+                select(table.c.id, table.c.phone_number).where(
+                    table.c.id.in_(phone_ids), table.c.is_blocked
+                )
+            )
+            for phone_id, number in blocked.all():
+                blocked_phones.update(phone_id, number, True)
+        logger.warning(
+            f"Blocked {result.rowcount} phone(s) after "
+            f"{self.block_threshold} failed logins in "
+            f"{self.window_seconds}s: {sorted(phone_ids)}"
+        )
+
+    async def run_blocker(self, session_factory):
+        """Background task blocking the phones over the threshold."""
+        while True:
+            await self._block_requested.wait()
+            self._block_requested.clear()
+            phone_ids, self._to_block = sorted(self._to_block), set()
+            try:
+                await self._block(session_factory, phone_ids)
+            except Exception as e:
+                self._to_block.update(phone_ids)
+                logger.error(f"Error blocking phones {phone_ids}: {e}")
+                await asyncio.sleep(self._bucket_seconds)
+                self._block_requested.set()
+                continue
+            # Start over: a blocked phone is queued again only after
+            # another full threshold of failures.
+            for phone_id in phone_ids:
+                self._counters["phone_id"].pop(phone_id, None)
+
+
+login_monitor = FailedLoginMonitor(
+    window_seconds=settings.LOGIN_MONITOR_WINDOW_SECONDS,
+    buckets=settings.LOGIN_MONITOR_BUCKETS,
+    max_keys=settings.LOGIN_MONITOR_MAX_KEYS,
+    block_threshold=settings.LOGIN_MONITOR_BLOCK_THRESHOLD,
+)
@@ -0,0 +1,205 @@
+"""
+Hourly rollup of login activity.
+
+``login_log_hourly`` holds the number of login events per hour, phone,
+outcome and result. ``login_rollup.run`` folds new ``login_log`` rows into
+it every ``LOGIN_ROLLUP_INTERVAL_SECONDS``: one INSERT ... SELECT ... GROUP
+BY ... ON DUPLICATE KEY UPDATE per ``LOGIN_ROLLUP_BATCH_ROWS`` ids, each
+committed together with the ``rollup_watermark`` (the last folded id), so
+a row is counted exactly once even if a fold is interrupted.
+
+A fold stops at the highest id seen by the previous fold, one interval
+back: ids are handed out before commit, so a transaction still open at
+the previous fold could commit an id below the current maximum later.
+
+``hourly_counts`` answers from the rollup plus the live tail (rows past
+the watermark, aggregated on the fly), read in one transaction so the
+two never overlap. Rollups outlive the login_log partitions that expire.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, literal, select, update
+from sqlalchemy.dialects.mysql import insert
+
+from config import settings
+from db.models import LoginLog, LoginLogHourly, RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = LoginLogHourly.__tablename__
+DIMENSIONS = ("phone_id", "result")
+
+
+# Constants are rendered inline so the GROUP BY expressions match the
+# selected ones exactly (ONLY_FULL_GROUP_BY).
+def _hour(column):
+    format = literal("%Y-%m-%d %H:00:00", literal_execute=True)
+    return func.date_format(column, format)
+
+
+def _result(column):
+    return func.coalesce(column, literal("", literal_execute=True))
+
+
+class LoginRollup:
+    def __init__(self):
+        # Highest login_log id at the previous fold: the next one's limit.
+        self._horizon: Optional[int] = None
+
+    @staticmethod
+    async def _watermark(session, create: bool = False) -> int:
+        marks = RollupWatermark.__table__
+        last_id = await session.scalar(
+            select(marks.c.last_id).where(marks.c.name == WATERMARK)
+        )
+        if last_id is None and create:
+            await session.execute(
+                insert(marks).prefix_with("IGNORE"),
+                {"name": WATERMARK, "last_id": 0},
+            )
+        return last_id or 0
+
+    async def fold(self, session) -> int:
+        """Fold the login logs that have settled; returns the new rows."""
+        logs = LoginLog.__table__
+        hourly = LoginLogHourly.__table__
+        marks = RollupWatermark.__table__
+        low = await self._watermark(session, create=True)
+        horizon = self._horizon
+        self._horizon = await session.scalar(select(func.max(logs.c.id)))
+        await session.commit()
+        if horizon is None or horizon <= low:
+            return 0
+        folded = 0
+        while low < horizon:
+            high = min(low + settings.LOGIN_ROLLUP_BATCH_ROWS, horizon)
+            hour = _hour(logs.c.event_time)
+            result = _result(logs.c.result)
+            source = (
+                select(
+                    hour,
+                    logs.c.phone_id,
+                    logs.c.is_successful,
+                    result,
+                    func.count(),
+                )
+                .where(logs.c.id > low, logs.c.id <= high)
+                .group_by(hour, logs.c.phone_id, logs.c.is_successful, result)
+            )
+            statement = insert(hourly).from_select(
+                ["hour", "phone_id", "is_successful", "result", "count"],
+                source,
+            )
+            statement = statement.on_duplicate_key_update(
+                count=hourly.c.count + statement.inserted.count
+            )
+            await session.execute(statement)
+            rows = await session.execute(
+                update(marks)
+                .where(marks.c.name == WATERMARK, marks.c.last_id == low)
+                .values(last_id=high)
+            )
+            if rows.rowcount != 1:
+                # Another process folded this range first.
+                await session.rollback()
+                logger.warning(f"Login rollup watermark moved past {low}")
+                return folded
+            await session.commit()
+            folded += high - low
+            low = high
+        return folded
+
+    async def hourly_counts(
+        self,
+        session,
+        start: datetime,
+        end: datetime,
+        phone_id: Optional[int] = None,
+        by: Tuple[str, ...] = DIMENSIONS,
+    ) -> List[dict]:
+        """
+        Login counts per hour and outcome (and ``by`` dimensions) for the
+        hours covering [start, end), from the rollup plus the live tail. Bounds
+        are naive Cairo time, like the stored timestamps.
+        """
+        logs = LoginLog.__table__
+        hourly = LoginLogHourly.__table__
+        # Whole hours, so rollup and tail cover the same span.
+        start = start.replace(minute=0, second=0, microsecond=0)
+        if end.minute or end.second or end.microsecond:
+            end = end.replace(minute=0, second=0, microsecond=0)
+            end += timedelta(hours=1)
+        last_id = await self._watermark(session)
+
+        def aggregate(table, hour, count, *where):
+            keys = [hour.label("hour"), table.c.is_successful]
+            if "phone_id" in by:
+                keys.append(table.c.phone_id)
+            if "result" in by:
+                keys.append(_result(table.c.result).label("result"))
+            if phone_id is not None:
+                where += (table.c.phone_id == phone_id,)
+            return (
+                select(*keys, count.label("count"))
+                .where(*where)
+                .group_by(*keys)
+            )
+
+        rolled = aggregate(
+            hourly,
+            hourly.c.hour,
+            func.sum(hourly.c.count),
+            hourly.c.hour >= start,
+            hourly.c.hour < end,
+        )
+        tail = aggregate(
+            logs,
+            _hour(logs.c.event_time),
+            func.count(),
+            logs.c.id > last_id,
+            logs.c.event_time >= start,
+            logs.c.event_time < end,
+        )
+        totals: Dict[tuple, dict] = {}
+        for statement in (rolled, tail):
+            for row in (await session.execute(statement)).mappings():
+                item = dict(row)
+                item["hour"] = _as_datetime(item["hour"])
+                item["count"] = int(item["count"])
+                key = tuple(
+                    value for name, value in item.items() if name != "count"
+                )
+                if key in totals:
+                    totals[key]["count"] += item["count"]
+                else:
+                    totals[key] = item
+        return sorted(
+            totals.values(),
+            key=lambda item: (item["hour"], -item["is_successful"]),
+        )
+
+    async def run(self, session_factory, interval: float):
+        logger.info(f"Starting login rollups every {interval}s.")
+        while True:
+            try:
+                async with session_factory() as session:
+                    folded = await self.fold(session)
+                if folded:
+                    logger.info(f"Login rollup folded {folded} ids")
+            except Exception as e:
+                logger.error(f"Login rollup failed: {e}")
+            await asyncio.sleep(interval)
+
+
+def _as_datetime(hour) -> datetime:
+    # DATE_FORMAT returns a string; the rollup column a datetime.
+    if isinstance(hour, str):
+        return datetime.strptime(hour, "%Y-%m-%d %H:%M:%S")
+    return hour
+
+
+login_rollup = LoginRollup()
@@ -0,0 +1,72 @@
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import TypeAdapter
+
+from core.schema import MenuItem, PageRead
+from db.models import Page
+
+logger = logging.getLogger(__name__)
+
+MENU_LOCALES = ("en", "ar")
+
+_page_list_adapter = TypeAdapter(List[PageRead])
+_menu_list_adapter = TypeAdapter(List[MenuItem])
+
+
+def serialize_menu(pages: Iterable[Page], locale: Optional[str]) -> bytes:
+    """
+    Serialize accessible pages to JSON bytes: the full PageRead list when no
+    locale is given, otherwise MenuItems localised to ``locale``.
+    """
+    if locale is None:
+        items = [PageRead.model_validate(page) for page in pages]
+        return _page_list_adapter.dump_json(items, by_alias=True)
+    items = [
+        MenuItem(
+            id=page.id,
+            path=page.path,
+            title=getattr(page, f"{locale}_title"),
+            description=getattr(page, f"{locale}_description"),
+            icon=page.icon,
+        )
+        for page in pages
+    ]
+    return _menu_list_adapter.dump_json(items, by_alias=True)
+
+
+class MenuCache:
+    """
+    Pre-serialized /permissions/my-pages responses keyed by the sorted
+    role-id tuple and locale. Cleared on any Page or RolePagePermission
+    write, so a menu load is a dictionary lookup.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[Tuple[int, ...], str], bytes] = {}
+
+    @staticmethod
+    def key(
+        role_ids: Iterable[int], locale: Optional[str]
+    ) -> Tuple[Tuple[int, ...], str]:
+        return tuple(sorted(set(role_ids))), locale or ""
+
+    def get(
+        self, role_ids: Iterable[int], locale: Optional[str]
+    ) -> Optional[bytes]:
+        return self._entries.get(self.key(role_ids, locale))
+
+    def put(
+        self, role_ids: Iterable[int], locale: Optional[str], body: bytes
+    ) -> None:
+        self._entries[self.key(role_ids, locale)] = body
+
+    def invalidate(self) -> None:
+        if self._entries:
+            logger.info(
+                f"Invalidating {len(self._entries)} cached navigation menu(s)."
+            )
+        self._entries = {}
+
+
+menu_cache = MenuCache()
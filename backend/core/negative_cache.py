@@ -0,0 +1,72 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class NegativeUsernameCache:
+    """
+    Bounded LRU of usernames known to be absent from the account table or
+    disabled, checked by login before any DB or LDAP work.
+
+    Entries expire after ``ttl_seconds`` so a missed invalidation heals
+    itself quickly; the least recently seen name is evicted once
+    ``max_entries`` is reached.
+    """
+
+    ABSENT = "absent"
+    DISABLED = "disabled"
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    @staticmethod
+    def _key(username: str) -> str:
+        # Account lookups go through MySQL's case-insensitive collation.
+        return username.strip().lower()
+
+    def get(self, username: str) -> Optional[str]:
+        """Return ABSENT/DISABLED for a cached username, else None."""
+        key = self._key(username)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        reason, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return reason
+
+    def add(self, username: str, reason: str) -> None:
+        key = self._key(username)
+        self._entries[key] = (reason, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, username: Optional[str]) -> None:
+        if username:
+            self._entries.pop(self._key(username), None)
+
+    def discard_many(self, usernames: Iterable[Optional[str]]) -> None:
+        for username in usernames:
+            self.discard(username)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+negative_username_cache = NegativeUsernameCache(
+    max_entries=settings.NEGATIVE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.NEGATIVE_CACHE_TTL_SECONDS,
+)
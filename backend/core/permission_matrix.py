@@ -0,0 +1,252 @@
+import base64
+import hashlib
+import logging
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from db.models import Page, RolePagePermission
+
+logger = logging.getLogger(__name__)
+
+# Bit order inside each page's 4-bit group.
+ACTIONS = ("view", "create", "edit", "delete")
+ACTION_BITS = {action: bit for bit, action in enumerate(ACTIONS)}
+ACTIONS_PER_PAGE = len(ACTIONS)
+
+
+def permission_bits(
+    can_view: bool, can_create: bool, can_edit: bool, can_delete: bool
+) -> int:
+    """Pack the four can_* flags into one 4-bit group."""
+    return (
+        int(bool(can_view))
+        | int(bool(can_create)) << 1
+        | int(bool(can_edit)) << 2
+        | int(bool(can_delete)) << 3
+    )
+
+
+class PermissionMatrix:
+    """
+    In-memory RBAC matrix built from ``role_page_permission``.
+
+    Every page owns a slot; each role holds one integer bitset where bit
+    ``slot * 4 + action`` is set when the role may perform that action on
+    the page. A role set's effective mask is the OR of its role masks and
+    is memoised, so a permission check is two dict lookups and a shift.
+    Writes through the page/permission endpoints patch the matrix in place.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._slot_by_path: Dict[str, int] = {}
+        self._slot_by_page: Dict[int, int] = {}
+        self._path_by_page: Dict[int, str] = {}
+        self._next_slot = 0
+        # role_id -> {page_id: 4-bit group}, kept to rebuild single masks
+        self._grants: Dict[int, Dict[int, int]] = {}
+        self._role_masks: Dict[int, int] = {}
+        self._effective: Dict[FrozenSet[int], int] = {}
+        self._version: Optional[str] = None
+
+    async def load(self, session: AsyncSession) -> None:
+        """Full rebuild from the database (startup)."""
+        pages = await session.execute(select(Page.id, Page.path))
+        grants = await session.execute(
+            select(
+                RolePagePermission.role_id,
+                RolePagePermission.page_id,
+                RolePagePermission.can_view,
+                RolePagePermission.can_create,
+                RolePagePermission.can_edit,
+                RolePagePermission.can_delete,
+            )
+        )
+        self._slot_by_path = {}
+        self._slot_by_page = {}
+        self._path_by_page = {}
+        self._next_slot = 0
+        for page_id, path in sorted(pages.all()):
+            self._assign_slot(page_id, path)
+        self._grants = {}
+        for role_id, page_id, *flags in grants.all():
+            self._grants.setdefault(role_id, {})[page_id] = permission_bits(
+                *flags
+            )
+        self._role_masks = {
+            role_id: self._build_role_mask(role_id)
+            for role_id in self._grants
+        }
+        self._effective = {}
+        self._version = None
+        self.loaded = True
+        logger.info(
+            f"Permission matrix built: {len(self._slot_by_page)} page(s), "
+            f"{len(self._role_masks)} role(s)."
+        )
+
+    def _assign_slot(self, page_id: int, path: str) -> None:
+        slot = self._next_slot
+        self._next_slot += 1
+        self._slot_by_page[page_id] = slot
+        self._slot_by_path[path] = slot
+        self._path_by_page[page_id] = path
+        self._version = None
+
+    def _build_role_mask(self, role_id: int) -> int:
+        mask = 0
+        for page_id, bits in self._grants.get(role_id, {}).items():
+            slot = self._slot_by_page.get(page_id)
+            if slot is not None:
+                mask |= bits << (slot * ACTIONS_PER_PAGE)
+        return mask
+
+    def _refresh_roles(self, role_ids: Iterable[int]) -> None:
+        for role_id in role_ids:
+            self._role_masks[role_id] = self._build_role_mask(role_id)
+        self._effective = {}
+        self._version = None
+
+    # --- incremental updates -------------------------------------------
+
+    def set_page(self, page_id: int, path: str) -> None:
+        """Register a new page or a changed path."""
+        if page_id not in self._slot_by_page:
+            self._assign_slot(page_id, path)
+            return
+        old_path = self._path_by_page[page_id]
+        if old_path != path:
+            slot = self._slot_by_path.pop(old_path)
+            self._slot_by_path[path] = slot
+            self._path_by_page[page_id] = path
+            self._version = None
+
+    def remove_page(self, page_id: int) -> None:
+        slot = self._slot_by_page.pop(page_id, None)
+        if slot is None:
+            return
+        self._slot_by_path.pop(self._path_by_page.pop(page_id), None)
+        self._version = None
+        affected = [
+            role_id
+            for role_id, grants in self._grants.items()
+            if grants.pop(page_id, None) is not None
+        ]
+        self._refresh_roles(affected)
+
+    def set_permission(
+        self,
+        role_id: int,
+        page_id: int,
+        can_view: bool,
+        can_create: bool,
+        can_edit: bool,
+        can_delete: bool,
+    ) -> None:
+        self._grants.setdefault(role_id, {})[page_id] = permission_bits(
+            can_view, can_create, can_edit, can_delete
+        )
+        self._refresh_roles([role_id])
+
+    def set_role_permissions(
+        self, role_id: int, grants: Dict[int, Tuple[bool, bool, bool, bool]]
+    ) -> None:
+        """Replace all of a role's grants ({page_id: can_* flags}) at once."""
+        self._grants[role_id] = {
+            page_id: permission_bits(*flags)
+            for page_id, flags in grants.items()
+        }
+        self._refresh_roles([role_id])
+
+    def remove_permission(self, role_id: int, page_id: int) -> None:
+        if self._grants.get(role_id, {}).pop(page_id, None) is not None:
+            self._refresh_roles([role_id])
+
+    # --- checks ----------------------------------------------------------
+
+    def effective_mask(self, role_ids: Iterable[int]) -> int:
+        key = frozenset(role_ids)
+        mask = self._effective.get(key)
+        if mask is None:
+            mask = 0
+            for role_id in key:
+                mask |= self._role_masks.get(role_id, 0)
+            self._effective[key] = mask
+        return mask
+
+    def slot_for(self, page_path: str) -> Optional[int]:
+        return self._slot_by_path.get(page_path)
+
+    def allows(
+        self, role_ids: Iterable[int], page_path: str, action: str
+    ) -> bool:
+        slot = self._slot_by_path.get(page_path)
+        if slot is None:
+            return False
+        bit = slot * ACTIONS_PER_PAGE + ACTION_BITS[action]
+        return bool(self.effective_mask(role_ids) >> bit & 1)
+
+    # --- token bitmaps -----------------------------------------------------
+
+    @property
+    def version(self) -> str:
+        """
+        Content hash of the page layout and every role mask. Processes
+        holding the same matrix agree on it, and any permission or page
+        write changes it, which is what marks token bitmaps stale.
+        """
+        if self._version is None:
+            digest = hashlib.blake2b(digest_size=6)
+            for path, slot in sorted(self._slot_by_path.items()):
+                digest.update(f"p{slot}:{path};".encode("utf-8"))
+            for role_id, mask in sorted(self._role_masks.items()):
+                if mask:
+                    digest.update(f"r{role_id}:{mask:x};".encode("utf-8"))
+            self._version = digest.hexdigest()
+        return self._version
+
+    def pack_mask(self, mask: int) -> str:
+        """Little-endian bytes of the mask, unpadded base64url."""
+        size = (self._next_slot * ACTIONS_PER_PAGE + 7) // 8
+        raw = mask.to_bytes(size, "little")
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+    @staticmethod
+    def unpack_mask(packed: str) -> int:
+        raw = base64.urlsafe_b64decode(packed + "=" * (-len(packed) % 4))
+        return int.from_bytes(raw, "little")
+
+    def token_claim(self, role_ids: Iterable[int]) -> Dict[str, str]:
+        """The ``perm`` claim embedded in access tokens."""
+        return {
+            "v": self.version,
+            "b": self.pack_mask(self.effective_mask(role_ids)),
+        }
+
+    def allows_from_claim(
+        self, claim: Dict[str, str], page_path: str, action: str
+    ) -> Optional[bool]:
+        """
+        Check a permission against a token's ``perm`` claim. Returns None
+        when the claim was issued for another matrix version (stale).
+        """
+        if claim.get("v") != self.version:
+            return None
+        slot = self._slot_by_path.get(page_path)
+        if slot is None:
+            return False
+        bit = slot * ACTIONS_PER_PAGE + ACTION_BITS[action]
+        return bool(self.unpack_mask(claim.get("b", "")) >> bit & 1)
+
+    def page_index(self) -> Dict:
+        """What another service needs to decode ``perm`` claims offline."""
+        return {
+            "version": self.version,
+            "actions": list(ACTIONS),
+            "pages": dict(sorted(self._slot_by_path.items())),
+        }
+
+
+permission_matrix = PermissionMatrix()
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict
 
@@ -36,6 +36,13 @@ class DomainUser(CustomModel):
 
 class DomainUserWithRoles(DomainUser):
     roles: list[int] | None = None
+    is_super_admin: bool = False
+
+
+class DomainUserWithGroups(DomainUser):
+    """DomainUser plus the SIDs of every group it belongs to (tokenGroups)."""
+
+    group_sids: list[str] = []
 
 
 # In core/schema.py
@@ -90,8 +97,42 @@ class RolePagePermissionUpdate(CustomModel):
     can_delete: Optional[bool] = None
 
 
+class RolePagePermissionMatrixItem(CustomModel):
+    """One cell row of a role's permission grid in a full-matrix update."""
+
+    page_id: int
+    can_view: bool = True
+    can_create: bool = False
+    can_edit: bool = False
+    can_delete: bool = False
+
+
 class RolePagePermissionRead(RolePagePermissionBase):
     id: int
     created_at: datetime
     updated_at: datetime
     updated_by: Optional[int] = None
+
+
+class MenuItem(CustomModel):
+    """A page localised to a single language for the navigation menu."""
+
+    id: int
+    path: str
+    title: str
+    description: Optional[str] = None
+    icon: Optional[str] = None
+
+
+class AccountRoleBulkRequest(CustomModel):
+    """Every (account, role) pair in account_ids x role_ids."""
+
+    account_ids: List[int]
+    role_ids: List[int]
+
+
+class AccountRoleBulkResult(CustomModel):
+    requested: int
+    assigned: int = 0
+    already_assigned: int = 0
+    removed: int = 0
@@ -0,0 +1,110 @@
+"""
+Process-local snapshots of small, hot reference tables.
+
+Each registered table is loaded into an immutable ``TableSnapshot``: its
+rows as read-only mappings ordered by id, an id index, and every row's
+JSON already serialized. The CRUD GET endpoints of these entities are
+answered from the snapshot, and other modules use ``lookup`` instead of a
+database round trip.
+
+A snapshot is never mutated. Writes through the CRUD routes build a new one
+and swap the reference, so a reader always sees a complete table. A
+background task compares each table's version (row count and
+MAX(updated_at)) with the database to pick up changes made by other
+processes or directly in MySQL.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TableSnapshot:
+    # (row count, MAX(updated_at)) when the snapshot was read
+    version: Tuple[Any, Any]
+    rows: Tuple[Mapping[str, Any], ...]
+    by_id: Mapping[int, Mapping[str, Any]]
+    json_by_id: Mapping[int, bytes]
+
+
+class SnapshotStore:
+    def __init__(self):
+        # model -> CrudQueries that knows how to read and serialize it
+        self._sources: Dict[type, Any] = {}
+        self._snapshots: Dict[type, TableSnapshot] = {}
+
+    def register(self, model: type, queries) -> None:
+        self._sources[model] = queries
+
+    def get(self, model: type) -> Optional[TableSnapshot]:
+        return self._snapshots.get(model)
+
+    def lookup(self, model: type, id: int) -> Optional[Mapping[str, Any]]:
+        """A row by id, or None when the table or row is not loaded."""
+        snapshot = self._snapshots.get(model)
+        return snapshot.by_id.get(id) if snapshot else None
+
+    async def reload(self, session: AsyncSession, model: type) -> None:
+        queries = self._sources[model]
+        version = tuple(
+            (await session.execute(queries.version_statement)).one()
+        )
+        result = await session.execute(
+            queries.list_statement.order_by(queries.pk)
+        )
+        rows = tuple(MappingProxyType(dict(row)) for row in result.mappings())
+        adapter = queries.item_adapter
+        self._snapshots[model] = TableSnapshot(
+            version=version,
+            rows=rows,
+            by_id=MappingProxyType({row["id"]: row for row in rows}),
+            json_by_id=MappingProxyType(
+                {
+                    row["id"]: adapter.dump_json(adapter.validate_python(row))
+                    for row in rows
+                }
+            ),
+        )
+
+    async def load_all(self, session: AsyncSession) -> None:
+        """Startup: read every registered table."""
+        for model in self._sources:
+            await self.reload(session, model)
+        logger.info(
+            "Reference snapshots loaded: "
+            + ", ".join(
+                f"{model.__name__}={len(self._snapshots[model].rows)}"
+                for model in self._sources
+            )
+        )
+
+    async def check_versions(self, session: AsyncSession) -> None:
+        """Reload the tables whose database version moved."""
+        for model, queries in self._sources.items():
+            version = tuple(
+                (await session.execute(queries.version_statement)).one()
+            )
+            snapshot = self._snapshots.get(model)
+            if snapshot is None or snapshot.version != version:
+                logger.info(f"{model.__name__} changed, reloading snapshot")
+                await self.reload(session, model)
+
+    async def run_version_checks(self, session_factory, interval: float):
+        logger.info(f"Starting snapshot version checks every {interval}s.")
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with session_factory() as session:
+                    await self.check_versions(session)
+            except Exception as e:
+                logger.error(f"Snapshot version check failed: {e}")
+
+
+snapshot_store = SnapshotStore()
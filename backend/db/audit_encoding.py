@@ -0,0 +1,390 @@
+"""
+Compact storage types for the audit tables.
+
+- ``AuditNameType``: table, column and operation names are stored as
+  SMALLINT ids from the ``audit_name`` dictionary and translated in memory
+  by ``audit_names``. ``audit_names.load`` registers every table and column
+  name of the models plus the operations at startup and reads the whole
+  dictionary; any other name is added by ``audit_names.ensure`` on its own
+  connection and committed at once, so an id is never handed out by a
+  transaction that later rolls back.
+- ``AuditValueType``: old and new values are stored as tagged bytes, either
+  plain UTF-8 or zlib-compressed from ``AUDIT_COMPRESS_MIN_BYTES``. When
+  ``AUDIT_DELTA_MIN_LENGTH`` is set, the new value of a long text that was
+  edited is stored as a compressed delta against the old value. A delta
+  reads back as ``AuditDelta`` and ``resolve_delta`` turns it into the text
+  using the row's old value (the Read schema and the export do this).
+
+The API keeps exchanging plain strings: binds encode and results decode,
+so filters such as ``table_name=branch`` work unchanged.
+
+    python -m db.audit_encoding migrate   # convert existing audit tables
+    python -m db.audit_encoding report    # storage saved on generated data
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+
+from sqlalchemy import (
+    LargeBinary,
+    SmallInteger,
+    TypeDecorator,
+    column,
+    insert,
+    select,
+    table,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import SQLModel
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ("INSERT", "UPDATE", "DELETE")
+
+TAG_TEXT = 0
+TAG_ZLIB = 1
+TAG_DELTA = 2
+
+# The audit_name model lives in db.models, which imports this module.
+audit_name_table = table("audit_name", column("id"), column("name"))
+
+
+class AuditNameDictionary:
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.names: Dict[int, str] = {}
+
+    def _add(self, rows) -> None:
+        for id, name in rows:
+            self.ids[name] = id
+            self.names[id] = name
+
+    @staticmethod
+    def _insert_missing(connection, names: Iterable[str]) -> None:
+        connection.execute(
+            insert(audit_name_table).prefix_with("IGNORE", dialect="mysql"),
+            [{"name": name} for name in sorted(names)],
+        )
+
+    def _load(self, connection) -> None:
+        names = set(OPERATIONS)
+        for model_table in SQLModel.metadata.tables.values():
+            names.add(model_table.name)
+            names.update(c.key for c in model_table.columns)
+        query = select(audit_name_table.c.id, audit_name_table.c.name)
+        self._add(connection.execute(query).all())
+        missing = names - set(self.ids)
+        if missing:
+            self._insert_missing(connection, missing)
+            self._add(connection.execute(query).all())
+
+    async def load(self, session: AsyncSession) -> None:
+        """Startup: register the model names and read the dictionary."""
+        await session.run_sync(
+            lambda sync_session: self._load(sync_session.connection())
+        )
+        await session.commit()
+        logger.info(f"Audit name dictionary loaded: {len(self.ids)} names")
+
+    def ensure(self, connection, names: Iterable[Optional[str]]) -> None:
+        """Give ``names`` ids, committing new ones on a separate connection."""
+        missing = {name for name in names if name and name not in self.ids}
+        if not missing:
+            return
+        with connection.engine.begin() as own:
+            self._insert_missing(own, missing)
+            self._add(
+                own.execute(
+                    select(
+                        audit_name_table.c.id, audit_name_table.c.name
+                    ).where(audit_name_table.c.name.in_(missing))
+                ).all()
+            )
+
+    def decode(self, id: int) -> str:
+        name = self.names.get(id)
+        if name is None:
+            # Added by another process after this one loaded.
+            logger.warning(f"Unknown audit name id {id}")
+            return f"#{id}"
+        return name
+
+
+audit_names = AuditNameDictionary()
+
+
+@dataclass(frozen=True)
+class AuditDelta:
+    """
+    A new value stored as edits of the old one: ``[start, end]`` copies
+    ``old[start:end]``, a string is inserted as is.
+    """
+
+    ops: List[Union[List[int], str]]
+
+    def apply(self, old: Optional[str]) -> str:
+        old = old or ""
+        return "".join(
+            op if isinstance(op, str) else old[op[0] : op[1]]
+            for op in self.ops
+        )
+
+
+def encode_value(text: str, min_bytes: Optional[int] = None) -> bytes:
+    if min_bytes is None:
+        min_bytes = settings.AUDIT_COMPRESS_MIN_BYTES
+    data = text.encode("utf-8")
+    if len(data) >= min_bytes:
+        packed = zlib.compress(data)
+        if len(packed) < len(data):
+            return bytes([TAG_ZLIB]) + packed
+    return bytes([TAG_TEXT]) + data
+
+
+def encode_delta(
+    old: Optional[str], new: Optional[str], min_length: Optional[int] = None
+) -> Optional[bytes]:
+    """The delta encoding of ``new``, or None when it does not pay off."""
+    if min_length is None:
+        min_length = settings.AUDIT_DELTA_MIN_LENGTH
+    if not min_length or old is None or new is None:
+        return None
+    if len(new) < min_length:
+        return None
+    # One changed span between the common prefix and suffix: linear, and
+    # what a form edit usually is.
+    prefix = len(os.path.commonprefix([old, new]))
+    limit = min(len(old), len(new)) - prefix
+    suffix = len(os.path.commonprefix([old[::-1][:limit], new[::-1][:limit]]))
+    ops: List[Union[List[int], str]] = []
+    if prefix:
+        ops.append([0, prefix])
+    if prefix + suffix < len(new):
+        ops.append(new[prefix : len(new) - suffix])
+    if suffix:
+        ops.append([len(old) - suffix, len(old)])
+    packed = bytes([TAG_DELTA]) + zlib.compress(
+        json.dumps(ops, separators=(",", ":")).encode("utf-8")
+    )
+    return packed if len(packed) < len(encode_value(new)) else None
+
+
+def decode_value(data: bytes) -> Union[str, AuditDelta]:
+    tag, payload = data[0], data[1:]
+    if tag == TAG_ZLIB:
+        return zlib.decompress(payload).decode("utf-8")
+    if tag == TAG_DELTA:
+        return AuditDelta(json.loads(zlib.decompress(payload)))
+    return payload.decode("utf-8")
+
+
+def resolve_delta(data: Any, fields: Iterable[str] = ()) -> Any:
+    """
+    Replace a delta ``new_value`` of a detail row with its text. ``data`` is
+    a dict, or a RowMapping or object read through ``fields`` (a RowMapping
+    iterates column names, not keys).
+    """
+    mapping = isinstance(data, Mapping)
+    new = (
+        data.get("new_value") if mapping else getattr(data, "new_value", None)
+    )
+    if not isinstance(new, AuditDelta):
+        return data
+    if mapping and not fields:
+        values = dict(data)
+    elif mapping:
+        values = {field: data[field] for field in fields if field in data}
+    else:
+        values = {
+            field: getattr(data, field)
+            for field in fields
+            if hasattr(data, field)
+        }
+    values["new_value"] = new.apply(values.get("old_value"))
+    return values
+
+
+class AuditNameType(TypeDecorator):
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        # Unknown names bind as NULL: filters match nothing and writes fail
+        # on NOT NULL; writers call audit_names.ensure first.
+        return None if value is None else audit_names.ids.get(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else audit_names.decode(value)
+
+
+class AuditValueType(TypeDecorator):
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes):
+            return value  # bytes are already encoded (deltas)
+        return encode_value(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else decode_value(value)
+
+
+# --- Migration --------------------------------------------------------------
+
+MIGRATION = [
+    "INSERT IGNORE INTO audit_name (name) "
+    "SELECT DISTINCT table_name FROM audit_log "
+    "UNION SELECT DISTINCT operation FROM audit_log "
+    "UNION SELECT DISTINCT column_name FROM audit_log_detail",
+    "ALTER TABLE audit_log ADD COLUMN table_id SMALLINT NULL, "
+    "ADD COLUMN operation_id SMALLINT NULL",
+    "UPDATE audit_log l JOIN audit_name t ON t.name = l.table_name "
+    "JOIN audit_name o ON o.name = l.operation "
+    "SET l.table_id = t.id, l.operation_id = o.id",
+    "ALTER TABLE audit_log DROP COLUMN table_name, DROP COLUMN operation, "
+    "MODIFY table_id SMALLINT NOT NULL, MODIFY operation_id SMALLINT NOT NULL",
+    "ALTER TABLE audit_log_detail ADD COLUMN column_id SMALLINT NULL",
+    "UPDATE audit_log_detail d JOIN audit_name c ON c.name = d.column_name "
+    "SET d.column_id = c.id",
+    "ALTER TABLE audit_log_detail DROP COLUMN column_name, "
+    "MODIFY column_id SMALLINT NOT NULL, "
+    "MODIFY old_value BLOB NULL, MODIFY new_value BLOB NULL",
+    # Existing values stay uncompressed, tagged as plain text.
+    "UPDATE audit_log_detail "
+    "SET old_value = IF(old_value IS NULL, NULL, CONCAT(X'00', old_value)), "
+    "new_value = IF(new_value IS NULL, NULL, CONCAT(X'00', new_value))",
+]
+
+
+def migrate(engine) -> None:
+    """Convert audit tables created with plain string columns (MySQL)."""
+    from db.models import AuditName
+
+    SQLModel.metadata.create_all(engine, tables=[AuditName.__table__])
+    with engine.begin() as connection:
+        legacy = connection.execute(
+            text(
+                "SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS "
+                "WHERE TABLE_SCHEMA = DATABASE() "
+                "AND TABLE_NAME = 'audit_log' AND COLUMN_NAME = 'table_name'"
+            )
+        ).scalar_one()
+        if not legacy:
+            logger.info("Audit tables are already encoded")
+            return
+        for statement in MIGRATION:
+            logger.info(statement)
+            connection.execute(text(statement))
+
+
+# --- Storage report ---------------------------------------------------------
+
+_REPORT_COLUMNS = {
+    "account": ["username", "fullname", "email", "is_active", "role_id"],
+    "role": ["en_name", "ar_name", "en_description", "ar_description"],
+    "role_page_permission": ["can_view", "can_create", "can_edit"],
+    "branch": ["branch_name", "address", "contact_info"],
+}
+_LONG_COLUMNS = {"en_description", "ar_description", "address"}
+_WORDS = (
+    "branch unit voucher patient access report review clinic network "
+    "service office north south main annex floor wing desk ward"
+).split()
+
+
+def _varchar(text: Optional[str]) -> int:
+    if text is None:
+        return 0
+    size = len(text.encode("utf-8"))
+    return size + (1 if size < 256 else 2)
+
+
+def _blob(data: Optional[bytes]) -> int:
+    return 0 if data is None else len(data) + 2
+
+
+def _generate(rng: random.Random, entries: int):
+    """(table, operation, [(column, old, new)]) like the recorder's."""
+    long_texts = {}
+    for _ in range(entries):
+        name = rng.choice(list(_REPORT_COLUMNS))
+        operation = rng.choices(OPERATIONS, weights=(2, 7, 1))[0]
+        details = []
+        for column_name in rng.sample(
+            _REPORT_COLUMNS[name], rng.randint(1, 3)
+        ):
+            if column_name in _LONG_COLUMNS and rng.random() < 0.3:
+                old = long_texts.get(column_name) or " ".join(
+                    rng.choice(_WORDS) for _ in range(rng.randint(150, 600))
+                )
+                words = old.split()
+                words[rng.randrange(len(words))] = rng.choice(_WORDS)
+                new = " ".join(words)
+                long_texts[column_name] = new
+            elif column_name.startswith(("is_", "can_")):
+                old, new = "False", "True"
+            else:
+                old = " ".join(rng.choice(_WORDS) for _ in range(2))
+                new = " ".join(rng.choice(_WORDS) for _ in range(2))
+            if operation == "INSERT":
+                old = None
+            elif operation == "DELETE":
+                new = None
+            details.append((column_name, old, new))
+        yield name, operation, details
+
+
+def storage_report(entries: int = 100000, seed: int = 7) -> str:
+    """Bytes in the encoded columns, before and after, on generated data."""
+    delta_length = settings.AUDIT_DELTA_MIN_LENGTH or 1024
+    plain = encoded = with_delta = 0
+    details_count = 0
+    rng = random.Random(seed)
+    for name, operation, details in _generate(rng, entries):
+        plain += _varchar(name) + _varchar(operation)
+        encoded += 4  # two SMALLINT ids
+        with_delta += 4
+        for column_name, old, new in details:
+            details_count += 1
+            plain += _varchar(column_name) + _varchar(old) + _varchar(new)
+            old_bytes = None if old is None else encode_value(old)
+            new_bytes = None if new is None else encode_value(new)
+            delta = encode_delta(old, new, delta_length)
+            encoded += 2 + _blob(old_bytes) + _blob(new_bytes)
+            with_delta += 2 + _blob(old_bytes) + _blob(delta or new_bytes)
+
+    def line(label: str, size: int) -> str:
+        saved = 100 * (plain - size) / plain if plain else 0
+        return f"{label:<34}{size / 2**20:>10.2f} MiB  {saved:>5.1f}% saved"
+
+    return "\n".join(
+        [
+            f"{entries} audit logs, {details_count} details "
+            f"(seed {seed}; name and value columns only)",
+            line("plain strings", plain),
+            line("names as ids, compressed values", encoded),
+            line(f"... and deltas from {delta_length} chars", with_delta),
+        ]
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "report":
+        print(storage_report(*map(int, sys.argv[2:3])))
+    elif len(sys.argv) == 2 and sys.argv[1] == "migrate":
+        from db.setup_database import sync_engine
+
+        migrate(sync_engine)
+    else:
+        print("Usage: python -m db.audit_encoding migrate | report [ENTRIES]")
+        sys.exit(2)
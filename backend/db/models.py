@@ -2,11 +2,25 @@ from datetime import datetime
 from typing import List, Optional
 
 import pytz
+from sqlalchemy import Column, Index, SmallInteger, UniqueConstraint
 from sqlmodel import Field, Relationship, SQLModel
 
+from db.audit_encoding import AuditNameType, AuditValueType
+
 cairo_tz = pytz.timezone("Africa/Cairo")
 
 
+def naive_local(moment: datetime) -> datetime:
+    """
+    ``moment`` as naive Cairo time, the way timestamps are stored, for
+    comparing against them: naive values are taken as Cairo time already,
+    aware ones are converted (the driver would drop their offset).
+    """
+    if moment.tzinfo:
+        return moment.astimezone(cairo_tz).replace(tzinfo=None)
+    return moment
+
+
 class TimeStampedModel(SQLModel):
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(cairo_tz)
@@ -73,13 +87,17 @@ class Role(TimeStampedModel, table=True):
             "foreign_keys": "[RolePagePermission.role_id]"
         },
     )
+    ad_group_roles: List["AdGroupRole"] = Relationship(
+        back_populates="role",
+        sa_relationship_kwargs={"foreign_keys": "[AdGroupRole.role_id]"},
+    )
 
 
 class Account(TimeStampedModel, table=True):
     __tablename__ = "account"
 
     id: int | None = Field(default=None, primary_key=True)
-    username: str
+    username: str = Field(index=True)
     password: str | None = None
     is_domain: bool = False
     is_super_admin: bool = False
@@ -175,6 +193,11 @@ class RolePagePermission(TimeStampedModel, table=True):
 
 class AccountPermission(SQLModel, table=True):
     __tablename__ = "account_permission"
+    __table_args__ = (
+        UniqueConstraint(
+            "account_id", "role_id", name="uq_account_permission_account_role"
+        ),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
     account_id: int = Field(foreign_key="account.id")
@@ -192,6 +215,21 @@ class AccountPermission(SQLModel, table=True):
     )
 
 
+class AdGroupRole(TimeStampedModel, table=True):
+    __tablename__ = "ad_group_role"
+
+    id: int | None = Field(default=None, primary_key=True)
+    group_sid: str = Field(index=True)
+    group_name: str | None = None
+    role_id: int = Field(foreign_key="role.id")
+    updated_by: int | None = Field(default=None, foreign_key="account.id")
+
+    role: Role = Relationship(
+        back_populates="ad_group_roles",
+        sa_relationship_kwargs={"foreign_keys": "[AdGroupRole.role_id]"},
+    )
+
+
 class Branch(TimeStampedModel, table=True):
     __tablename__ = "branch"
 
@@ -259,7 +297,7 @@ class Phone(TimeStampedModel, table=True):
     __tablename__ = "phone"
 
     id: int | None = Field(default=None, primary_key=True)
-    phone_number: str
+    phone_number: str = Field(index=True)
     is_blocked: bool = False
     updated_by: int | None = Field(default=None, foreign_key="account.id")
 
@@ -344,7 +382,7 @@ class LoginLog(SQLModel, table=True):
     phone_id: int = Field(foreign_key="phone.id")
     device_ip: str
     event_time: datetime = Field(
-        default_factory=lambda: datetime.now(cairo_tz)
+        default_factory=lambda: datetime.now(cairo_tz), index=True
     )
     is_successful: bool
     result: str | None = None
@@ -356,19 +394,55 @@ class LoginLog(SQLModel, table=True):
     phone: Phone = Relationship(back_populates="login_logs")
 
 
+class LoginLogHourly(SQLModel, table=True):
+    """Login counts per hour, phone and outcome (core.login_rollup)."""
+
+    __tablename__ = "login_log_hourly"
+
+    hour: datetime = Field(primary_key=True)
+    phone_id: int = Field(primary_key=True)
+    is_successful: bool = Field(primary_key=True)
+    # "" for events without a result: key columns cannot be NULL.
+    result: str = Field(default="", primary_key=True)
+    count: int = 0
+
+
+class RollupWatermark(SQLModel, table=True):
+    """Last source row id folded into a rollup table."""
+
+    __tablename__ = "rollup_watermark"
+
+    name: str = Field(primary_key=True)
+    last_id: int = 0
+
+
 class AuditLog(SQLModel, table=True):
     __tablename__ = "audit_log"
+    __table_args__ = (
+        # History of one record (core.audit_history).
+        Index("ix_audit_log_record", "table_name", "record_id", "changed_at"),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
-    table_name: str
+    # Names are stored as audit_name ids (see db.audit_encoding).
+    table_name: str = Field(
+        sa_column=Column(
+            "table_id", AuditNameType(), nullable=False, key="table_name"
+        )
+    )
     record_id: int
-    operation: str
+    operation: str = Field(
+        sa_column=Column(
+            "operation_id", AuditNameType(), nullable=False, key="operation"
+        )
+    )
     changed_at: datetime = Field(
-        default_factory=lambda: datetime.now(cairo_tz)
+        default_factory=lambda: datetime.now(cairo_tz), index=True
     )
-    changed_by: int = Field(foreign_key="account.id")
+    # NULL when the change was made without an authenticated account.
+    changed_by: int | None = Field(default=None, foreign_key="account.id")
 
-    changed_by_account: Account = Relationship(
+    changed_by_account: Optional[Account] = Relationship(
         back_populates="audit_logs",
         sa_relationship_kwargs={"foreign_keys": "[AuditLog.changed_by]"},
     )
@@ -379,9 +453,53 @@ class AuditLogDetail(SQLModel, table=True):
     __tablename__ = "audit_log_detail"
 
     id: int | None = Field(default=None, primary_key=True)
-    audit_log_id: int = Field(foreign_key="audit_log.id")
-    column_name: str
-    old_value: str | None = None
-    new_value: str | None = None
+    audit_log_id: int = Field(foreign_key="audit_log.id", index=True)
+    column_name: str = Field(
+        sa_column=Column(
+            "column_id", AuditNameType(), nullable=False, key="column_name"
+        )
+    )
+    old_value: str | None = Field(
+        default=None, sa_column=Column(AuditValueType())
+    )
+    new_value: str | None = Field(
+        default=None, sa_column=Column(AuditValueType())
+    )
 
     audit_log: AuditLog = Relationship(back_populates="details")
+
+
+class AuditSnapshot(SQLModel, table=True):
+    """Full state of an audited record as of ``audit_log_id``."""
+
+    __tablename__ = "audit_snapshot"
+    __table_args__ = (
+        Index(
+            "ix_audit_snapshot_record", "table_name", "record_id", "changed_at"
+        ),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    table_name: str = Field(
+        sa_column=Column(
+            "table_id", AuditNameType(), nullable=False, key="table_name"
+        )
+    )
+    record_id: int
+    # No foreign key: audit_log is partitioned, and a snapshot outlives the
+    # months it was built from.
+    audit_log_id: int
+    changed_at: datetime
+    # JSON of the column values, in their audit text form
+    state: str = Field(sa_column=Column(AuditValueType(), nullable=False))
+
+
+class AuditName(SQLModel, table=True):
+    """Dictionary of the table, column and operation names in the audit."""
+
+    __tablename__ = "audit_name"
+
+    id: int | None = Field(
+        default=None, primary_key=True, sa_type=SmallInteger
+    )
+    name: str = Field(unique=True)
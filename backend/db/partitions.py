@@ -0,0 +1,445 @@
+"""
+Monthly RANGE partitions for the log tables, with retention and archival.
+
+``audit_log`` is partitioned on ``changed_at`` and ``login_log`` on
+``event_time``, one partition per month (``p202401`` holds January 2024)
+plus ``p_future`` for anything past the last month. ``audit_log_detail``
+follows ``audit_log``: it is partitioned on ``audit_log_id`` and, once a
+month is over, gets a partition of the same name ending at the first
+``audit_log`` id of the next month. Queries on a time range only touch
+the partitions they need, and expiring a month is a DROP PARTITION.
+
+MySQL does not allow foreign keys on partitioned tables and needs the
+partitioning column in the primary key, so ``setup`` drops the foreign
+keys of these tables (the ORM relationships are unaffected) and widens
+their primary keys. It rewrites each table once; run it in a maintenance
+window:
+
+    python -m db.partitions setup
+
+``maintain`` (run by the application every
+``PARTITION_MAINTENANCE_INTERVAL_SECONDS`` when
+``PARTITION_MAINTENANCE_ENABLED`` is set, or from the command line) adds
+partitions ``PARTITION_MONTHS_AHEAD`` months ahead, gives
+``audit_log_detail`` the partitions of the months that are over, and
+drops the months older than the table's retention. Each month is first
+written to ``PARTITION_ARCHIVE_DIR/<table>/<table>_<YYYYMM>.jsonl.gz``
+and only dropped when the file holds every row of the partition.
+
+An archive is gzipped JSON lines: a header with the table and columns,
+then row groups of up to ``EXPORT_BATCH_ROWS`` rows stored column by
+column (binary audit values as ``{"$b64": ...}``; audit names stay
+``audit_name`` ids), then a trailer with the row count. ``restore`` inserts a file
+back (``INSERT IGNORE``, so it can be repeated):
+
+    python -m db.partitions restore archive/audit_log/audit_log_202301.jsonl.gz
+
+Restored rows land in the oldest partition and are archived again when
+that partition expires.
+"""
+
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import os
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import column, insert, table, text
+from sqlalchemy.engine import Connection, Engine
+
+from config import settings
+from db.models import cairo_tz
+from db.setup_database import sync_engine
+
+logger = logging.getLogger(__name__)
+
+FUTURE = "p_future"
+DETAIL_TABLE = "audit_log_detail"
+DETAIL_PARENT = "audit_log"
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    name: str
+    column: str
+    retention_months: int  # 0 keeps everything
+
+
+TIME_PARTITIONED = (
+    PartitionedTable(
+        "audit_log", "changed_at", settings.AUDIT_LOG_RETENTION_MONTHS
+    ),
+    PartitionedTable(
+        "login_log", "event_time", settings.LOGIN_LOG_RETENTION_MONTHS
+    ),
+)
+
+
+def _month(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def _add_months(month: datetime, count: int) -> datetime:
+    years, index = divmod(month.month - 1 + count, 12)
+    return datetime(month.year + years, index + 1, 1)
+
+
+def _partition_name(month: datetime) -> str:
+    return f"p{month:%Y%m}"
+
+
+def _partition_month(name: str) -> Optional[datetime]:
+    if name == FUTURE:
+        return None
+    return datetime.strptime(name[1:], "%Y%m")
+
+
+def _time_partitions(first: datetime, last: datetime) -> List[str]:
+    """Definitions of the monthly partitions from ``first`` to ``last``."""
+    definitions = []
+    month = first
+    while month <= last:
+        end = _add_months(month, 1)
+        definitions.append(
+            f"PARTITION {_partition_name(month)} "
+            f"VALUES LESS THAN ('{end:%Y-%m-%d %H:%M:%S}')"
+        )
+        month = end
+    return definitions
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, bytes):
+        return {"$b64": base64.b64encode(value).decode("ascii")}
+    return value
+
+
+def _restored(value):
+    if isinstance(value, dict):
+        return base64.b64decode(value["$b64"])
+    return value
+
+
+class PartitionManager:
+    def __init__(self, engine: Engine, archive_dir: str):
+        self.engine = engine
+        self.archive_dir = Path(archive_dir)
+
+    # --- Inspection ---
+
+    @staticmethod
+    def partitions(connection: Connection, name: str) -> List[str]:
+        """Partition names in order; empty when not partitioned."""
+        result = connection.execute(
+            text(
+                "SELECT PARTITION_NAME FROM INFORMATION_SCHEMA.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :name "
+                "AND PARTITION_NAME IS NOT NULL "
+                "ORDER BY PARTITION_ORDINAL_POSITION"
+            ),
+            {"name": name},
+        )
+        return list(result.scalars())
+
+    @staticmethod
+    def _row_count(connection: Connection, name: str, partition: str):
+        return connection.execute(
+            text(f"SELECT COUNT(*) FROM {name} PARTITION ({partition})")
+        ).scalar_one()
+
+    @staticmethod
+    def _detail_boundary(connection: Connection, before: datetime) -> int:
+        """First audit_log id at or after ``before``, or the next id."""
+        boundary = connection.execute(
+            text(
+                f"SELECT MIN(id) FROM {DETAIL_PARENT} "
+                "WHERE changed_at >= :before"
+            ),
+            {"before": before},
+        ).scalar_one()
+        if boundary is None:
+            boundary = connection.execute(
+                text(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {DETAIL_PARENT}")
+            ).scalar_one()
+        return boundary
+
+    # --- Setup ---
+
+    @staticmethod
+    def _drop_foreign_keys(connection: Connection, name: str) -> None:
+        """Drop the foreign keys of ``name`` and those pointing at it."""
+        result = connection.execute(
+            text(
+                "SELECT TABLE_NAME, CONSTRAINT_NAME "
+                "FROM INFORMATION_SCHEMA.REFERENTIAL_CONSTRAINTS "
+                "WHERE CONSTRAINT_SCHEMA = DATABASE() "
+                "AND (TABLE_NAME = :name OR REFERENCED_TABLE_NAME = :name)"
+            ),
+            {"name": name},
+        )
+        for owner, constraint in result.all():
+            logger.info(f"Dropping foreign key {owner}.{constraint}")
+            connection.execute(
+                text(f"ALTER TABLE {owner} DROP FOREIGN KEY {constraint}")
+            )
+
+    def setup(self, now: Optional[datetime] = None) -> None:
+        """Partition the log tables that are not partitioned yet."""
+        current = _month(now or datetime.now(cairo_tz))
+        with self.engine.connect() as connection:
+            for spec in TIME_PARTITIONED:
+                if self.partitions(connection, spec.name):
+                    logger.info(f"{spec.name} is already partitioned")
+                    continue
+                oldest = connection.execute(
+                    text(f"SELECT MIN({spec.column}) FROM {spec.name}")
+                ).scalar_one()
+                definitions = _time_partitions(
+                    _month(oldest) if oldest else current,
+                    _add_months(current, settings.PARTITION_MONTHS_AHEAD),
+                )
+                definitions.append(
+                    f"PARTITION {FUTURE} VALUES LESS THAN (MAXVALUE)"
+                )
+                self._drop_foreign_keys(connection, spec.name)
+                logger.info(
+                    f"Partitioning {spec.name} into "
+                    f"{len(definitions)} partitions"
+                )
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {spec.name} DROP PRIMARY KEY, "
+                        f"ADD PRIMARY KEY (id, {spec.column}) "
+                        f"PARTITION BY RANGE COLUMNS({spec.column}) "
+                        f"({', '.join(definitions)})"
+                    )
+                )
+            if not self.partitions(connection, DETAIL_TABLE):
+                self._drop_foreign_keys(connection, DETAIL_TABLE)
+                logger.info(f"Partitioning {DETAIL_TABLE}")
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {DETAIL_TABLE} DROP PRIMARY KEY, "
+                        "ADD PRIMARY KEY (id, audit_log_id) "
+                        "PARTITION BY RANGE (audit_log_id) "
+                        f"(PARTITION {FUTURE} VALUES LESS THAN (MAXVALUE))"
+                    )
+                )
+            self._split_detail(connection, current)
+
+    # --- Maintenance ---
+
+    @staticmethod
+    def _reorganize_future(
+        connection: Connection, name: str, definitions: List[str]
+    ) -> None:
+        connection.execute(
+            text(
+                f"ALTER TABLE {name} REORGANIZE PARTITION {FUTURE} INTO "
+                f"({', '.join(definitions)}, "
+                f"PARTITION {FUTURE} VALUES LESS THAN (MAXVALUE))"
+            )
+        )
+
+    def _add_future(
+        self, connection: Connection, spec: PartitionedTable, current
+    ) -> None:
+        months = [
+            month
+            for month in map(
+                _partition_month, self.partitions(connection, spec.name)
+            )
+            if month
+        ]
+        definitions = _time_partitions(
+            _add_months(months[-1], 1) if months else current,
+            _add_months(current, settings.PARTITION_MONTHS_AHEAD),
+        )
+        if definitions:
+            logger.info(f"Adding {len(definitions)} partitions to {spec.name}")
+            self._reorganize_future(connection, spec.name, definitions)
+
+    def _split_detail(self, connection: Connection, current) -> None:
+        """Give audit_log_detail a partition per finished month."""
+        detail = self.partitions(connection, DETAIL_TABLE)
+        if not detail:
+            return
+        done = {month for month in map(_partition_month, detail) if month}
+        latest = max(done) if done else None
+        previous = None
+        if latest:
+            previous = self._detail_boundary(
+                connection, _add_months(latest, 1)
+            )
+        definitions = []
+        for name in self.partitions(connection, DETAIL_PARENT):
+            month = _partition_month(name)
+            end = _add_months(month, 1) if month else None
+            if not month or end > current or (latest and month <= latest):
+                continue
+            boundary = self._detail_boundary(connection, end)
+            if previous is not None and boundary <= previous:
+                continue  # no audit_log rows that month
+            definitions.append(
+                f"PARTITION {name} VALUES LESS THAN ({boundary})"
+            )
+            previous = boundary
+        if definitions:
+            logger.info(
+                f"Adding {len(definitions)} partitions to {DETAIL_TABLE}"
+            )
+            self._reorganize_future(connection, DETAIL_TABLE, definitions)
+
+    def _expire(
+        self, connection: Connection, spec: PartitionedTable, current
+    ) -> None:
+        if not spec.retention_months:
+            return
+        cutoff = _add_months(current, -spec.retention_months)
+        detail = (
+            self.partitions(connection, DETAIL_TABLE)
+            if spec.name == DETAIL_PARENT
+            else []
+        )
+        for name in self.partitions(connection, spec.name):
+            month = _partition_month(name)
+            if not month or _add_months(month, 1) > cutoff:
+                break
+            self.archive(connection, spec.name, name)
+            if name in detail:
+                self.archive(connection, DETAIL_TABLE, name)
+                connection.execute(
+                    text(f"ALTER TABLE {DETAIL_TABLE} DROP PARTITION {name}")
+                )
+            connection.execute(
+                text(f"ALTER TABLE {spec.name} DROP PARTITION {name}")
+            )
+            logger.info(f"Dropped {spec.name} partition {name}")
+
+    def maintain(self, now: Optional[datetime] = None) -> None:
+        current = _month(now or datetime.now(cairo_tz))
+        with self.engine.connect() as connection:
+            for spec in TIME_PARTITIONED:
+                if not self.partitions(connection, spec.name):
+                    logger.warning(
+                        f"{spec.name} is not partitioned, run "
+                        "'python -m db.partitions setup'"
+                    )
+                    continue
+                self._add_future(connection, spec, current)
+                if spec.name == DETAIL_PARENT:
+                    self._split_detail(connection, current)
+                self._expire(connection, spec, current)
+
+    async def run_maintenance(self, interval: float):
+        logger.info(f"Starting partition maintenance every {interval}s.")
+        while True:
+            try:
+                await asyncio.to_thread(self.maintain)
+            except Exception as e:
+                logger.error(f"Partition maintenance failed: {e}")
+            await asyncio.sleep(interval)
+
+    # --- Archive and restore ---
+
+    def archive_path(self, name: str, partition: str) -> Path:
+        return self.archive_dir / name / f"{name}_{partition[1:]}.jsonl.gz"
+
+    def archive(self, connection: Connection, name: str, partition: str):
+        """
+        Write one partition to its archive file, streaming row groups from
+        a server-side cursor. Raises when the file does not hold every row
+        of the partition, so the caller never drops unarchived data.
+        """
+        path = self.archive_path(name, partition)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".partial")
+        result = connection.execute(
+            text(
+                f"SELECT * FROM {name} PARTITION ({partition})"
+            ).execution_options(yield_per=settings.EXPORT_BATCH_ROWS)
+        )
+        columns = list(result.keys())
+        rows = 0
+        with gzip.open(partial, "wt", encoding="utf-8") as file:
+            header = {"table": name, "partition": partition}
+            file.write(json.dumps({**header, "columns": columns}) + "\n")
+            for group in result.partitions():
+                # Column by column: [[id, id, ...], [column_2, ...], ...]
+                by_column = [
+                    [_value(value) for value in values]
+                    for values in zip(*group)
+                ]
+                file.write(json.dumps(by_column) + "\n")
+                rows += len(group)
+            file.write(json.dumps({"rows": rows}) + "\n")
+        expected = self._row_count(connection, name, partition)
+        if rows != expected:
+            partial.unlink()
+            raise RuntimeError(
+                f"Archived {rows} of {expected} rows from {name} "
+                f"{partition}, not dropping it"
+            )
+        os.replace(partial, path)
+        logger.info(f"Archived {rows} rows of {name} {partition} to {path}")
+        return path
+
+    def restore(self, path: str) -> int:
+        """Insert the rows of an archive file back into its table."""
+        rows = 0
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            header = json.loads(file.readline())
+            name, columns = header["table"], header["columns"]
+            target = table(name, *map(column, columns))
+            complete = False
+            with self.engine.begin() as connection:
+                for line in file:
+                    group = json.loads(line)
+                    if isinstance(group, dict):
+                        complete = group["rows"] == rows
+                        break
+                    # Timestamps stay strings; MySQL parses their format.
+                    batch = [
+                        dict(zip(columns, map(_restored, row)))
+                        for row in zip(*group)
+                    ]
+                    connection.execute(
+                        insert(target).prefix_with("IGNORE"), batch
+                    )
+                    rows += len(batch)
+                if not complete:
+                    # Leaving the block with an error rolls back.
+                    raise ValueError(f"{path} is truncated, nothing restored")
+        logger.info(f"Restored {rows} rows into {name} from {path}")
+        return rows
+
+
+partition_manager = PartitionManager(
+    sync_engine, settings.PARTITION_ARCHIVE_DIR
+)
+
+
+if __name__ == "__main__":
+    commands = {"setup", "maintain", "restore"}
+    if len(sys.argv) < 2 or sys.argv[1] not in commands:
+        print(
+            "Usage: python -m db.partitions setup | maintain | "
+            "restore FILE..."
+        )
+        sys.exit(2)
+    if sys.argv[1] == "setup":
+        partition_manager.setup()
+        partition_manager.maintain()
+    elif sys.argv[1] == "maintain":
+        partition_manager.maintain()
+    else:
+        for archive in sys.argv[2:]:
+            partition_manager.restore(archive)
@@ -0,0 +1,437 @@
+"""
+Read/write schemas for the CRUD routers.
+
+Each entity has a Create schema (request body for POST), an Update schema
+(every field optional, for partial PUT) and a Read schema (response body).
+Read schemas list exactly the columns that are selected and returned, so
+secrets such as ``Account.password`` never leave the API.
+"""
+
+from datetime import datetime
+from enum import Enum
+from typing import Dict, List, Optional
+
+from pydantic import model_validator
+from sqlmodel import SQLModel
+
+from db.audit_encoding import resolve_delta
+
+# --- Branch ------------------------------------------------------------------
+
+
+class BranchBase(SQLModel):
+    branch_name: str
+    address: Optional[str] = None
+    contact_info: Optional[str] = None
+    updated_by: Optional[int] = None
+
+
+class BranchCreate(BranchBase):
+    pass
+
+
+class BranchUpdate(SQLModel):
+    branch_name: Optional[str] = None
+    address: Optional[str] = None
+    contact_info: Optional[str] = None
+    updated_by: Optional[int] = None
+
+
+class BranchRead(BranchBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+# --- Unit --------------------------------------------------------------------
+
+
+class UnitBase(SQLModel):
+    unit_name: str
+    updated_by: Optional[int] = None
+
+
+class UnitCreate(UnitBase):
+    pass
+
+
+class UnitUpdate(SQLModel):
+    unit_name: Optional[str] = None
+    updated_by: Optional[int] = None
+
+
+class UnitRead(UnitBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+# --- UnitProfile -------------------------------------------------------------
+
+
+class UnitProfileBase(SQLModel):
+    unit_id: int
+    visit_validity_hours: int
+    voucher_expiry_hours: int
+    updated_by: Optional[int] = None
+
+
+class UnitProfileCreate(UnitProfileBase):
+    pass
+
+
+class UnitProfileUpdate(SQLModel):
+    unit_id: Optional[int] = None
+    visit_validity_hours: Optional[int] = None
+    voucher_expiry_hours: Optional[int] = None
+    updated_by: Optional[int] = None
+
+
+class UnitProfileRead(UnitProfileBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+# --- BranchUnit --------------------------------------------------------------
+
+
+class BranchUnitBase(SQLModel):
+    branch_id: int
+    unit_profile_id: int
+    network_subnet: Optional[str] = None
+    validation_duration_hours: int
+    sophos_url: Optional[str] = None
+    updated_by: Optional[int] = None
+
+
+class BranchUnitCreate(BranchUnitBase):
+    pass
+
+
+class BranchUnitUpdate(SQLModel):
+    branch_id: Optional[int] = None
+    unit_profile_id: Optional[int] = None
+    network_subnet: Optional[str] = None
+    validation_duration_hours: Optional[int] = None
+    sophos_url: Optional[str] = None
+    updated_by: Optional[int] = None
+
+
+class BranchUnitRead(BranchUnitBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+# --- VoucherStatus -----------------------------------------------------------
+
+
+class VoucherStatusBase(SQLModel):
+    status: str
+    updated_by: Optional[int] = None
+
+
+class VoucherStatusCreate(VoucherStatusBase):
+    pass
+
+
+class VoucherStatusUpdate(SQLModel):
+    status: Optional[str] = None
+    updated_by: Optional[int] = None
+
+
+class VoucherStatusRead(VoucherStatusBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+# --- Phone -------------------------------------------------------------------
+
+
+class PhoneBase(SQLModel):
+    phone_number: str
+    is_blocked: bool = False
+    updated_by: Optional[int] = None
+
+
+class PhoneCreate(PhoneBase):
+    pass
+
+
+class PhoneUpdate(SQLModel):
+    phone_number: Optional[str] = None
+    is_blocked: Optional[bool] = None
+    updated_by: Optional[int] = None
+
+
+class PhoneRead(PhoneBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class PhoneCheckRead(SQLModel):
+    phone_number: str  # normalized
+    is_blocked: bool
+
+
+# --- LoginLog ----------------------------------------------------------------
+
+
+class LoginLogBase(SQLModel):
+    phone_id: int
+    device_ip: str
+    is_successful: bool
+    result: Optional[str] = None
+    updated_by: Optional[int] = None
+
+
+class LoginLogCreate(LoginLogBase):
+    event_time: Optional[datetime] = None
+
+
+class LoginLogUpdate(SQLModel):
+    phone_id: Optional[int] = None
+    device_ip: Optional[str] = None
+    event_time: Optional[datetime] = None
+    is_successful: Optional[bool] = None
+    result: Optional[str] = None
+    updated_by: Optional[int] = None
+
+
+class LoginLogRead(LoginLogBase):
+    id: int
+    event_time: datetime
+    updated_at: datetime
+
+
+class IngestDurability(str, Enum):
+    # Answered once buffered; lost if the process dies before the flush.
+    accepted = "accepted"
+    # Answered once the flush holding the events has committed.
+    committed = "committed"
+
+
+class LoginLogIngestResult(SQLModel):
+    durability: IngestDurability
+    accepted: int
+    # Rows written, for committed durability (failed rows are dropped).
+    written: Optional[int] = None
+
+
+class LoginLogHourlyRead(SQLModel):
+    hour: datetime
+    is_successful: bool
+    count: int
+    # Present when grouped by them (``by``); result "" means no result.
+    phone_id: Optional[int] = None
+    result: Optional[str] = None
+
+
+class LoginOffenderRead(SQLModel):
+    # One of the two, depending on ``by``.
+    device_ip: Optional[str] = None
+    phone_id: Optional[int] = None
+    failures: int
+    window_seconds: float
+
+
+# --- Account -----------------------------------------------------------------
+
+
+class AccountBase(SQLModel):
+    username: str
+    is_domain: bool = False
+    is_super_admin: bool = False
+    is_active: bool = True
+    title: Optional[str] = None
+    fullname: Optional[str] = None
+    email: Optional[str] = None
+    role_id: Optional[int] = None
+    updated_by: Optional[int] = None
+
+
+class AccountCreate(AccountBase):
+    password: Optional[str] = None
+
+
+class AccountUpdate(SQLModel):
+    username: Optional[str] = None
+    password: Optional[str] = None
+    is_domain: Optional[bool] = None
+    is_super_admin: Optional[bool] = None
+    is_active: Optional[bool] = None
+    title: Optional[str] = None
+    fullname: Optional[str] = None
+    email: Optional[str] = None
+    role_id: Optional[int] = None
+    updated_by: Optional[int] = None
+
+
+class AccountRead(AccountBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+# --- Role --------------------------------------------------------------------
+
+
+class RoleBase(SQLModel):
+    en_name: Optional[str] = None
+    ar_name: Optional[str] = None
+    ar_description: Optional[str] = None
+    en_description: Optional[str] = None
+    updated_by: Optional[int] = None
+
+
+class RoleCreate(RoleBase):
+    pass
+
+
+class RoleUpdate(RoleBase):
+    pass
+
+
+class RoleRead(RoleBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+# --- AuditLog ----------------------------------------------------------------
+
+
+class AuditLogBase(SQLModel):
+    table_name: str
+    record_id: int
+    operation: str
+    changed_by: Optional[int] = None
+
+
+class AuditLogCreate(AuditLogBase):
+    changed_at: Optional[datetime] = None
+
+
+class AuditLogUpdate(SQLModel):
+    table_name: Optional[str] = None
+    record_id: Optional[int] = None
+    operation: Optional[str] = None
+    changed_at: Optional[datetime] = None
+    changed_by: Optional[int] = None
+
+
+class AuditLogRead(AuditLogBase):
+    id: int
+    changed_at: datetime
+
+
+# --- AuditLogDetail ----------------------------------------------------------
+
+
+class AuditLogDetailBase(SQLModel):
+    audit_log_id: int
+    column_name: str
+    old_value: Optional[str] = None
+    new_value: Optional[str] = None
+
+
+class AuditLogDetailCreate(AuditLogDetailBase):
+    pass
+
+
+class AuditLogDetailUpdate(SQLModel):
+    audit_log_id: Optional[int] = None
+    column_name: Optional[str] = None
+    old_value: Optional[str] = None
+    new_value: Optional[str] = None
+
+
+class AuditLogDetailRead(AuditLogDetailBase):
+    id: int
+
+    @model_validator(mode="before")
+    @classmethod
+    def _resolve_delta(cls, data):
+        return resolve_delta(data, cls.model_fields)
+
+
+class AuditLogHistoryRead(AuditLogRead):
+    """An audit log with its details embedded."""
+
+    details: List[AuditLogDetailRead] = []
+
+
+class AuditStateRead(SQLModel):
+    """An audited record rebuilt from the audit trail as of a moment."""
+
+    table_name: str
+    record_id: int
+    as_of: Optional[datetime] = None
+    exists: bool
+    # Column values in their audit text form
+    values: Dict[str, Optional[str]]
+    # Last change applied, and how many were replayed after the snapshot
+    audit_log_id: Optional[int] = None
+    changed_at: Optional[datetime] = None
+    replayed: int = 0
+
+
+# --- AdGroupRole -------------------------------------------------------------
+
+
+class AdGroupRoleBase(SQLModel):
+    group_sid: str
+    group_name: Optional[str] = None
+    role_id: int
+    updated_by: Optional[int] = None
+
+
+class AdGroupRoleCreate(AdGroupRoleBase):
+    pass
+
+
+class AdGroupRoleUpdate(SQLModel):
+    group_sid: Optional[str] = None
+    group_name: Optional[str] = None
+    role_id: Optional[int] = None
+    updated_by: Optional[int] = None
+
+
+class AdGroupRoleRead(AdGroupRoleBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+# --- Bulk writes -------------------------------------------------------------
+
+
+class BulkMode(str, Enum):
+    # Every item is written or none is.
+    atomic = "atomic"
+    # Items that fail are reported and skipped; the rest are committed.
+    best_effort = "best_effort"
+
+
+class BulkDeleteRequest(SQLModel):
+    mode: BulkMode = BulkMode.atomic
+    ids: List[int]
+
+
+class BulkItemResult(SQLModel):
+    index: int
+    id: Optional[int] = None
+    # created | updated | deleted | not_found | failed | skipped | rolled_back
+    status: str
+    error: Optional[str] = None
+
+
+class BulkResult(SQLModel):
+    mode: BulkMode
+    committed: bool
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
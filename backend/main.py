@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
@@ -10,10 +11,27 @@ from routers.unit_profile_router import router as unit_profile_router
 from routers.branch_unit_router import router as branch_unit_router
 from routers.voucher_status_router import router as voucher_status_router
 from routers.login_log_router import router as login_log_router
+from routers.phone_router import router as phone_router
 from routers.account_router import router as account_router
 from routers.role_router import router as role_router
 from routers.audit_log_router import router as audit_log_router
 from routers.audit_log_detail_router import router as audit_log_detail_router
+from routers.ad_group_role_router import router as ad_group_role_router
+from routers.domain_controller_router import router as domain_controller_router
+from routers.page_router import page_router, permission_router
+from routers.account_permission_router import router as account_permission_router
+from config import settings
+from core.audit import audit_recorder
+from core.blocked_phones import blocked_phones
+from core.domain_controllers import domain_controller_pool
+from core.login_ingest import login_log_buffer
+from core.login_monitor import login_monitor
+from core.login_rollup import login_rollup
+from core.permission_matrix import permission_matrix
+from core.snapshots import snapshot_store
+from db.audit_encoding import audit_names
+from db.database import AsyncSessionLocal
+from db.partitions import partition_manager
 from db.setup_database import setup_database
 
 # Configure logging
@@ -28,12 +46,60 @@ async def lifespan(app: FastAPI):
     # Startup: setup the database before the application starts
     logging.info("Starting up the application and setting up the database")
     await setup_database()
+    audit_recorder.install()
+    login_monitor.install()
+    async with AsyncSessionLocal() as session:
+        await audit_names.load(session)
+        await permission_matrix.load(session)
+        await snapshot_store.load_all(session)
+        await blocked_phones.load(session)
+    background_tasks = [
+        asyncio.create_task(
+            domain_controller_pool.run_health_checks(
+                settings.AD_HEALTH_CHECK_INTERVAL_SECONDS
+            )
+        ),
+        asyncio.create_task(
+            snapshot_store.run_version_checks(
+                AsyncSessionLocal, settings.SNAPSHOT_CHECK_INTERVAL_SECONDS
+            )
+        ),
+        asyncio.create_task(
+            blocked_phones.run_reloads(
+                AsyncSessionLocal, settings.BLOCKED_PHONES_RELOAD_SECONDS
+            )
+        ),
+        asyncio.create_task(login_log_buffer.run_flusher(AsyncSessionLocal)),
+        asyncio.create_task(
+            login_rollup.run(
+                AsyncSessionLocal, settings.LOGIN_ROLLUP_INTERVAL_SECONDS
+            )
+        ),
+    ]
+    if settings.PARTITION_MAINTENANCE_ENABLED:
+        background_tasks.append(
+            asyncio.create_task(
+                partition_manager.run_maintenance(
+                    settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS
+                )
+            )
+        )
+    if settings.LOGIN_MONITOR_BLOCK_THRESHOLD:
+        background_tasks.append(
+            asyncio.create_task(login_monitor.run_blocker(AsyncSessionLocal))
+        )
+    if settings.AUDIT_WRITE_BEHIND:
+        background_tasks.append(
+            asyncio.create_task(audit_recorder.run_writer(AsyncSessionLocal))
+        )
 
     yield  # This is where the application runs
 
     # Shutdown: cleanup operations when the application is shutting down
     logging.info("Shutting down the application")
-    # Add any cleanup code here if needed
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
 
 
 # Create the FastAPI app with the lifespan
@@ -51,8 +117,14 @@ app.include_router(unit_router)
 app.include_router(unit_profile_router)
 app.include_router(branch_unit_router)
 app.include_router(voucher_status_router)
+app.include_router(phone_router)
 app.include_router(login_log_router)
 app.include_router(account_router)
 app.include_router(role_router)
 app.include_router(audit_log_router)
 app.include_router(audit_log_detail_router)
+app.include_router(ad_group_role_router)
+app.include_router(domain_controller_router)
+app.include_router(page_router)
+app.include_router(permission_router)
+app.include_router(account_permission_router)
@@ -0,0 +1,141 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.mysql import insert
+from sqlmodel import select
+from typing import List
+from config import settings
+from db.models import Account, AccountPermission, Role
+from core.dependencies import SessionDep, require_permission
+from core.schema import AccountRoleBulkRequest, AccountRoleBulkResult
+from core.snapshots import snapshot_store
+from routers.page_router import ROLES_ADMIN_PATH
+
+router = APIRouter(prefix="/account-permissions", tags=["AccountPermission"])
+logger = logging.getLogger("AccountPermission")
+
+
+def _chunks(items: List, size: int):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+async def _check_ids_exist(session, request: AccountRoleBulkRequest):
+    accounts = await session.execute(
+        select(Account.id).where(Account.id.in_(request.account_ids))
+    )
+    unknown_accounts = set(request.account_ids) - set(accounts.scalars())
+    unknown_roles = {
+        role_id
+        for role_id in request.role_ids
+        if snapshot_store.lookup(Role, role_id) is None
+    }
+    if unknown_roles:
+        # The snapshot may lag behind roles created by another process.
+        roles = await session.execute(
+            select(Role.id).where(Role.id.in_(unknown_roles))
+        )
+        unknown_roles -= set(roles.scalars())
+    if unknown_accounts or unknown_roles:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            f"Unknown account id(s): {sorted(unknown_accounts)}, "
+            f"role id(s): {sorted(unknown_roles)}",
+        )
+
+
+@router.post(
+    "/bulk-assign",
+    response_model=AccountRoleBulkResult,
+    dependencies=[Depends(require_permission(ROLES_ADMIN_PATH, "edit"))],
+)
+async def bulk_assign_roles(
+    request: AccountRoleBulkRequest, session: SessionDep
+):
+    """
+    Assign every role in role_ids to every account in account_ids using
+    chunked multi-row INSERT ... ON DUPLICATE KEY UPDATE in one transaction.
+    """
+    account_ids = sorted(set(request.account_ids))
+    role_ids = sorted(set(request.role_ids))
+    requested = len(account_ids) * len(role_ids)
+    if not requested:
+        return AccountRoleBulkResult(requested=0)
+    try:
+        logger.info(
+            f"Assigning {len(role_ids)} role(s) to {len(account_ids)} account(s)"
+        )
+        await _check_ids_exist(session, request)
+        existing = await session.scalar(
+            select(func.count())
+            .select_from(AccountPermission)
+            .where(
+                AccountPermission.account_id.in_(account_ids),
+                AccountPermission.role_id.in_(role_ids),
+            )
+        )
+        pairs = [
+            {"account_id": account_id, "role_id": role_id}
+            for account_id in account_ids
+            for role_id in role_ids
+        ]
+        for chunk in _chunks(pairs, settings.BULK_CHUNK_SIZE):
+            statement = insert(AccountPermission).values(chunk)
+            statement = statement.on_duplicate_key_update(
+                role_id=statement.inserted.role_id
+            )
+            await session.execute(statement)
+        await session.commit()
+        return AccountRoleBulkResult(
+            requested=requested,
+            assigned=requested - existing,
+            already_assigned=existing,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        await session.rollback()
+        logger.error(f"Error bulk assigning roles: {e}")
+        raise HTTPException(500, "Internal server error")
+
+
+@router.post(
+    "/bulk-unassign",
+    response_model=AccountRoleBulkResult,
+    dependencies=[Depends(require_permission(ROLES_ADMIN_PATH, "edit"))],
+)
+async def bulk_unassign_roles(
+    request: AccountRoleBulkRequest, session: SessionDep
+):
+    """
+    Remove every role in role_ids from every account in account_ids using
+    chunked multi-row DELETEs in one transaction.
+    """
+    account_ids = sorted(set(request.account_ids))
+    role_ids = sorted(set(request.role_ids))
+    requested = len(account_ids) * len(role_ids)
+    if not requested:
+        return AccountRoleBulkResult(requested=0)
+    try:
+        logger.info(
+            f"Unassigning {len(role_ids)} role(s) from {len(account_ids)} account(s)"
+        )
+        await _check_ids_exist(session, request)
+        account_chunk_size = max(1, settings.BULK_CHUNK_SIZE // len(role_ids))
+        removed = 0
+        for chunk in _chunks(account_ids, account_chunk_size):
+            result = await session.execute(
+                delete(AccountPermission).where(
+                    AccountPermission.account_id.in_(chunk),
+                    AccountPermission.role_id.in_(role_ids),
+                )
+            )
+            removed += result.rowcount
+        await session.commit()
+        return AccountRoleBulkResult(requested=requested, removed=removed)
+    except HTTPException:
+        raise
+    except Exception as e:
+        await session.rollback()
+        logger.error(f"Error bulk unassigning roles: {e}")
+        raise HTTPException(500, "Internal server error")
@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+from db.models import AdGroupRole
+from db.schemas import AdGroupRoleCreate, AdGroupRoleRead, AdGroupRoleUpdate
+from core.ad_group_roles import ad_group_role_cache
+from core.crud import CrudSpec, add_crud_routes
+
+router = APIRouter(prefix="/ad-group-roles", tags=["AdGroupRole"])
+
+
+def _invalidate_cache(mapping: AdGroupRole) -> None:
+    ad_group_role_cache.invalidate()
+
+
+add_crud_routes(
+    router,
+    CrudSpec(
+        model=AdGroupRole,
+        name="AD group role mapping",
+        plural="AD group role mappings",
+        read_schema=AdGroupRoleRead,
+        create_schema=AdGroupRoleCreate,
+        update_schema=AdGroupRoleUpdate,
+        on_write=(_invalidate_cache,),
+        filters=("role_id", "group_sid"),
+    ),
+)
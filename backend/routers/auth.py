@@ -1,6 +1,6 @@
 import logging
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 import icecream
 from fastapi import APIRouter, HTTPException, status
@@ -12,8 +12,11 @@ from sqlmodel import select
 
 from config import Settings
 from core.active_directory import ActiveDirectoryService
+from core.ad_group_roles import ad_group_role_cache
 from core.dependencies import SessionDep
 from core.http_schemas import LoginRequest, RefreshTokenRequest, TokenResponse
+from core.negative_cache import negative_username_cache
+from core.permission_matrix import permission_matrix
 from core.password_hash import verify_hashed_password
 from core.schema import DomainUserWithRoles
 from db.models import Account, AccountPermission, Role
@@ -58,10 +61,16 @@ async def read_account(
 
 
 async def read_account_roles_ids(
-    session: AsyncSession, account_id: int
+    session: AsyncSession,
+    account_id: int,
+    group_sids: Optional[List[str]] = None,
 ) -> List[int]:
     """
-    Retrieve all role names assigned to a specific account.
+    Retrieve all role ids assigned to a specific account.
+
+    Roles mapped from the account's AD groups (``group_sids``, from the AD
+    bind at login or carried by the refresh token) are merged in, resolved
+    against the current AD group-to-role mapping.
     """
     logger.debug(f"Retrieving role names for account_id: {account_id}")
     if account_id is None:
@@ -76,11 +85,16 @@ async def read_account_roles_ids(
             .where(AccountPermission.account_id == account_id)
         )
         results = await session.execute(statement)
-        role_names = results.scalars().all()
+        role_ids = set(results.scalars().all())
+        group_role_ids = await ad_group_role_cache.resolve_roles(
+            session, group_sids or ()
+        )
+        role_ids.update(group_role_ids)
         logger.debug(
-            f"Found {len(role_names)} role(s) for account_id: {account_id}"
+            f"Found {len(role_ids)} role(s) for account_id: {account_id} "
+            f"({len(group_role_ids)} from AD groups)"
         )
-        return role_names
+        return sorted(role_ids)
     except Exception as e:
         logger.error(
             f"Database error retrieving roles for account_id {account_id}: {e}",
@@ -94,9 +108,15 @@ async def create_access_token(
 ) -> tuple[str, int]:
     """
     Create a signed JWT access token.
+    When EMBED_PERMISSIONS_IN_TOKEN is set, the account's effective page
+    permissions are added as a versioned bitmap under the "perm" claim.
     Returns (token, expires_at_ms).
     """
     to_encode = data.copy()
+    if settings.EMBED_PERMISSIONS_IN_TOKEN and "account" in data:
+        to_encode["perm"] = permission_matrix.token_claim(
+            data["account"].get("roles") or []
+        )
     now = datetime.now()
     expire = now + (
         expires_delta
@@ -111,10 +131,14 @@ async def create_access_token(
     return token, int(expire.timestamp() * 1000)
 
 
-async def create_refresh_token(account_id: int) -> str:
+async def create_refresh_token(
+    account_id: int, group_sids: Optional[List[str]] = None
+) -> str:
     """
     Create a signed JWT refresh token.
-    Embeds a "type" claim for easy validation.
+    Embeds a "type" claim for easy validation, and the AD group SIDs of
+    the login under "groups" so a refresh (which has no AD bind) resolves
+    them against the current group-to-role mapping.
     """
     now = datetime.now()
     expire = now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
@@ -124,6 +148,8 @@ async def create_refresh_token(account_id: int) -> str:
         "iat": now,
         "exp": expire,
     }
+    if group_sids:
+        payload["groups"] = list(group_sids)
     return jwt.encode(
         claims=payload,
         key=settings.SESSION_SECRET,
@@ -131,10 +157,10 @@ async def create_refresh_token(account_id: int) -> str:
     )
 
 
-async def decode_refresh_token(token: str) -> int:
+async def decode_refresh_token(token: str) -> Tuple[int, List[str]]:
     """
     Verify and decode a refresh token.
-    Returns the integer account_id on success.
+    Returns the integer account_id and the AD group SIDs on success.
     """
     try:
         print(f"Decoding refresh token: {token}")
@@ -151,7 +177,10 @@ async def decode_refresh_token(token: str) -> int:
                     "code": "INVALID_LOGIN",
                 },
             )
-        return int(payload["sub"].split("_", 1)[1])
+        return (
+            int(payload["sub"].split("_", 1)[1]),
+            payload.get("groups") or [],
+        )
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -185,20 +214,53 @@ async def login(session: SessionDep, form_data: LoginRequest):
             detail="Accountname and password are required.",
         )
 
+    group_sids: Optional[List[str]] = None
     try:
-        # 2. Find account in the local database first
+        # 2. Reject names already known to be absent or disabled
+        cached_reason = negative_username_cache.get(username)
+        if cached_reason == negative_username_cache.ABSENT:
+            logger.warning(
+                f"Login failed: Account '{username}' not found (cached)."
+            )
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Account not found.",
+            )
+        if cached_reason == negative_username_cache.DISABLED:
+            logger.warning(
+                f"Login failed: Account '{username}' is disabled (cached)."
+            )
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Account is disabled.",
+            )
+
+        # 3. Find account in the local database
         account = await read_account(session, username=username)
 
         if not account:
             logger.warning(
                 f"Login failed: Account '{username}' not found in local database."
             )
+            negative_username_cache.add(
+                username, negative_username_cache.ABSENT
+            )
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Account not found.",
             )
 
-        # 3. Perform Authentication
+        if not account.is_active:
+            logger.warning(f"Login failed: Account '{username}' is disabled.")
+            negative_username_cache.add(
+                username, negative_username_cache.DISABLED
+            )
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Account is disabled.",
+            )
+
+        # 4. Perform Authentication
         if username == "admin":
             logger.debug(
                 f"Attempting local authentication for admin account: {username}"
@@ -230,8 +292,16 @@ async def login(session: SessionDep, form_data: LoginRequest):
             )
             ad_connection = ActiveDirectoryService(username, password)
             ad_account_info = (
-                await ad_connection.get_account_info_if_authenticated()
+                await ad_connection.get_user_info_if_authenticated()
             )
+            if ad_connection.account_disabled:
+                negative_username_cache.add(
+                    username, negative_username_cache.DISABLED
+                )
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Account is disabled.",
+                )
             if not ad_account_info:
                 logger.warning(
                     f"Active Directory authentication failed for account: {username}"
@@ -243,8 +313,9 @@ async def login(session: SessionDep, form_data: LoginRequest):
             logger.info(
                 f"Active Directory authentication successful for account: {username}"
             )
+            group_sids = ad_account_info.group_sids
 
-        # 4. Fetch Account Roles
+        # 5. Fetch Account Roles
         if account.id is None:
             logger.error(
                 f"Account '{username}' found but has no ID. Cannot fetch roles."
@@ -254,12 +325,14 @@ async def login(session: SessionDep, form_data: LoginRequest):
                 detail="Account data inconsistency.",
             )
 
-        roles = await read_account_roles_ids(session, account.id)
+        roles = await read_account_roles_ids(
+            session, account.id, group_sids=group_sids
+        )
         logger.info(
             f"Retrieved {len(roles)} role(s) for account_id: {account.id}"
         )
 
-        # 5. Prepare Account Data for Token
+        # 6. Prepare Account Data for Token
         base_data = account.model_dump(exclude={"password"})
         try:
             account_attrs = DomainUserWithRoles(**base_data, roles=roles)
@@ -273,10 +346,10 @@ async def login(session: SessionDep, form_data: LoginRequest):
                 detail="Error preparing account data for token.",
             )
 
-        # 6. Create Token
+        # 7. Create Token
         account_dict = {"account": account_attrs.model_dump()}
         access_token, expires_at = await create_access_token(account_dict)
-        refresh_token = await create_refresh_token(account.id)
+        refresh_token = await create_refresh_token(account.id, group_sids)
         logger.info(f"Token created successfully for account: {username}")
 
         return TokenResponse(
@@ -313,10 +386,14 @@ async def refresh_token(session: SessionDep, request: RefreshTokenRequest):
     Handle refresh token requests and issue new tokens.
     """
     try:
-        account_id = await decode_refresh_token(request.refresh_token)
+        account_id, group_sids = await decode_refresh_token(
+            request.refresh_token
+        )
         logger.info(f"Decoded account_id from refresh token: {account_id}")
         account = await read_account(session, account_id=account_id)
-        roles = await read_account_roles_ids(session, account.id)
+        roles = await read_account_roles_ids(
+            session, account.id, group_sids=group_sids
+        )
         try:
             account_attrs = DomainUserWithRoles(
                 **account.model_dump(exclude={"password"}), roles=roles
@@ -337,7 +414,7 @@ async def refresh_token(session: SessionDep, request: RefreshTokenRequest):
             ),
         )
 
-        new_refresh_token = await create_refresh_token(account_id)
+        new_refresh_token = await create_refresh_token(account_id, group_sids)
 
         logger.info(f"Generated new tokens with expiry: {expires_at}")
         return TokenResponse(
@@ -0,0 +1,14 @@
+import logging
+from fastapi import APIRouter
+from typing import Dict, List
+from core.domain_controllers import domain_controller_pool
+
+router = APIRouter(prefix="/domain-controllers", tags=["DomainController"])
+logger = logging.getLogger("DomainController")
+
+
+@router.get("/", response_model=List[Dict])
+async def read_domain_controller_metrics():
+    """Per-DC health, EWMA latency and share of LDAP traffic."""
+    logger.info("Reading domain controller metrics")
+    return domain_controller_pool.metrics()
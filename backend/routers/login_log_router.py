@@ -1,90 +1,150 @@
 import logging
-from fastapi import APIRouter, HTTPException, status
-from sqlmodel import select
-from typing import List
-from db.models import LoginLog
+from datetime import datetime, timedelta
+from typing import List, Literal, Optional, Union
+from fastapi import APIRouter, HTTPException, Query, Response, status
+from sqlalchemy import select
+from config import settings
+from db.models import LoginLog, cairo_tz, naive_local
+from db.schemas import (
+    IngestDurability,
+    LoginLogCreate,
+    LoginLogHourlyRead,
+    LoginLogIngestResult,
+    LoginOffenderRead,
+    LoginLogRead,
+    LoginLogUpdate,
+)
+from core.crud import CrudSpec, add_crud_routes
 from core.dependencies import SessionDep
+from core.export import add_export_route
+from core.login_ingest import BufferClosed, BufferFull, login_log_buffer
+from core.login_monitor import login_monitor
+from core.login_rollup import DIMENSIONS, login_rollup
 
 router = APIRouter(prefix="/login-logs", tags=["LoginLog"])
 logger = logging.getLogger("LoginLog")
 
 
-@router.get("/", response_model=List[LoginLog])
-async def read_login_logs(session: SessionDep):
-    try:
-        logger.info("Reading all login logs")
-        result = await session.execute(select(LoginLog))
-        return result.scalars().all()
-    except Exception as e:
-        logger.error(f"Error reading login logs: {e}")
-        raise HTTPException(500, "Internal server error")
-
-
-@router.get("/{id}", response_model=LoginLog)
-async def read_login_log(id: int, session: SessionDep):
+@router.post(
+    "/ingest",
+    response_model=LoginLogIngestResult,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def ingest_login_logs(
+    events: Union[LoginLogCreate, List[LoginLogCreate]],
+    response: Response,
+    durability: Optional[IngestDurability] = Query(
+        None, description="Defaults to LOGIN_INGEST_DURABILITY"
+    ),
+):
+    """
+    Buffer one event or a list of events for batched insertion (see
+    core.login_ingest). 202 once buffered, or 201 once committed with
+    durability=committed; 503 with Retry-After while the buffer is full.
+    """
+    if not isinstance(events, list):
+        events = [events]
+    durability = durability or IngestDurability(
+        settings.LOGIN_INGEST_DURABILITY
+    )
+    committed = durability == IngestDurability.committed
     try:
-        logger.info(f"Reading login log {id}")
-        login_log = await session.get(LoginLog, id)
-        if not login_log:
-            logger.warning(f"LoginLog {id} not found")
-            raise HTTPException(404, "LoginLog not found")
-        return login_log
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error reading login log {id}: {e}")
-        raise HTTPException(500, "Internal server error")
+        count = await login_log_buffer.put(
+            [event.model_dump() for event in events], committed
+        )
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    except (BufferFull, BufferClosed) as e:
+        logger.warning(f"Refused {len(events)} login logs: {e}")
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            str(e),
+            headers={"Retry-After": "1"},
+        )
+    if committed:
+        response.status_code = status.HTTP_201_CREATED
+    return LoginLogIngestResult(
+        durability=durability,
+        accepted=len(events),
+        written=count if committed else None,
+    )
 
 
-@router.post("/", response_model=LoginLog, status_code=status.HTTP_201_CREATED)
-async def create_login_log(login_log: LoginLog, session: SessionDep):
-    try:
-        logger.info("Creating login log")
-        session.add(login_log)
-        await session.commit()
-        await session.refresh(login_log)
-        return login_log
-    except Exception as e:
-        logger.error(f"Error creating login log: {e}")
-        raise HTTPException(500, "Internal server error")
+@router.get("/hourly", response_model=List[LoginLogHourlyRead])
+async def hourly_login_counts(
+    session: SessionDep,
+    start: Optional[datetime] = Query(
+        None, description="Inclusive; defaults to 24 hours before end"
+    ),
+    end: Optional[datetime] = Query(
+        None, description="Exclusive; defaults to now"
+    ),
+    phone_id: Optional[int] = None,
+    by: str = Query(
+        ",".join(DIMENSIONS),
+        description="Comma separated subset of phone_id,result; empty "
+        "for totals per hour",
+    ),
+):
+    """
+    Successful and failed logins per hour, from the hourly rollups plus
+    the rows not folded yet (see core.login_rollup).
+    """
+    dimensions = tuple(name for name in by.split(",") if name)
+    unknown = set(dimensions) - set(DIMENSIONS)
+    if unknown:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            f"Unknown grouping: {', '.join(sorted(unknown))}",
+        )
+    end = naive_local(end or datetime.now(cairo_tz))
+    start = naive_local(start) if start else end - timedelta(hours=24)
+    if start >= end:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, "start must be before end"
+        )
+    return await login_rollup.hourly_counts(
+        session, start, end, phone_id=phone_id, by=dimensions
+    )
 
 
-@router.put("/{id}", response_model=LoginLog)
-async def update_login_log(
-    id: int, login_log_data: LoginLog, session: SessionDep
+@router.get("/offenders", response_model=List[LoginOffenderRead])
+async def top_failed_logins(
+    by: Literal["device_ip", "phone_id"] = "device_ip",
+    limit: int = Query(10, ge=1, le=settings.PAGE_SIZE_MAX),
 ):
-    try:
-        logger.info(f"Updating login log {id}")
-        login_log = await session.get(LoginLog, id)
-        if not login_log:
-            logger.warning(f"LoginLog {id} not found")
-            raise HTTPException(404, "LoginLog not found")
-        for key, value in login_log_data.dict(exclude_unset=True).items():
-            setattr(login_log, key, value)
-        session.add(login_log)
-        await session.commit()
-        await session.refresh(login_log)
-        return login_log
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error updating login log {id}: {e}")
-        raise HTTPException(500, "Internal server error")
+    """
+    Device IPs or phones with the most failed logins in the last
+    LOGIN_MONITOR_WINDOW_SECONDS, from this process's in-memory counters
+    (see core.login_monitor).
+    """
+    return [
+        LoginOffenderRead(
+            **{by: key},
+            failures=failures,
+            window_seconds=login_monitor.window_seconds,
+        )
+        for key, failures in login_monitor.top(by, limit)
+    ]
 
 
-@router.delete("/{id}")
-async def delete_login_log(id: int, session: SessionDep):
-    try:
-        logger.info(f"Deleting login log {id}")
-        login_log = await session.get(LoginLog, id)
-        if not login_log:
-            logger.warning(f"LoginLog {id} not found")
-            raise HTTPException(404, "LoginLog not found")
-        await session.delete(login_log)
-        await session.commit()
-        return {"ok": True}
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error deleting login log {id}: {e}")
-        raise HTTPException(500, "Internal server error")
+add_export_route(
+    router,
+    select(LoginLog.__table__).order_by(LoginLog.event_time, LoginLog.id),
+    time_column=LoginLog.event_time,
+    filename="login_log",
+)
+
+add_crud_routes(
+    router,
+    CrudSpec(
+        model=LoginLog,
+        name="login log",
+        plural="login logs",
+        read_schema=LoginLogRead,
+        create_schema=LoginLogCreate,
+        update_schema=LoginLogUpdate,
+        filters=("phone_id", "device_ip", "is_successful"),
+        sort_keys=("event_time",),
+    ),
+)
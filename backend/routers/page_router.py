@@ -1,42 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import delete, insert, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select, and_
-from typing import List
+from typing import List, Literal, Optional, Union
 
-from core.dependencies import SessionDep, get_current_user
+from core.dependencies import SessionDep, get_current_user, require_permission
+from core.menu_cache import menu_cache, serialize_menu
+from core.permission_matrix import permission_matrix
 from core.schema import (
+    MenuItem,
     PageCreate,
     PageRead,
     PageUpdate,
     RolePagePermissionCreate,
+    RolePagePermissionMatrixItem,
     RolePagePermissionRead,
     RolePagePermissionUpdate,
 )
+from core.snapshots import snapshot_store
 from db.models import (
     Account,
-    AccountPermission,
     Page,
     Role,
     RolePagePermission,
+    cairo_tz,
 )
 
 # Create routers
 page_router = APIRouter(prefix="/pages", tags=["pages"])
 permission_router = APIRouter(prefix="/permissions", tags=["permissions"])
 
+# Front-end pages whose permissions guard these admin endpoints
+PAGES_ADMIN_PATH = "/admin/pages"
+ROLES_ADMIN_PATH = "/admin/roles"
+
+MATRIX_FLAGS = ("can_view", "can_create", "can_edit", "can_delete")
+
 
 # Page endpoints
 @page_router.post("/", response_model=PageRead)
 async def create_page(
     page: PageCreate,
     session: SessionDep,
-    current_user: Account = Depends(get_current_user),
+    current_user: Account = Depends(
+        require_permission(PAGES_ADMIN_PATH, "create")
+    ),
 ):
     """Create a new page."""
     db_page = Page(**page.model_dump(), updated_by=current_user.id)
     session.add(db_page)
     await session.commit()
     await session.refresh(db_page)
+    permission_matrix.set_page(db_page.id, db_page.path)
+    menu_cache.invalidate()
     return db_page
 
 
@@ -77,7 +94,9 @@ async def update_page(
     page_id: int,
     page_update: PageUpdate,
     session: SessionDep,
-    current_user: Account = Depends(get_current_user),
+    current_user: Account = Depends(
+        require_permission(PAGES_ADMIN_PATH, "edit")
+    ),
 ):
     """Update a page."""
     statement = select(Page).where(Page.id == page_id)
@@ -96,6 +115,8 @@ async def update_page(
     db_page.updated_by = current_user.id
     await session.commit()
     await session.refresh(db_page)
+    permission_matrix.set_page(db_page.id, db_page.path)
+    menu_cache.invalidate()
     return db_page
 
 
@@ -103,7 +124,9 @@ async def update_page(
 async def delete_page(
     page_id: int,
     session: SessionDep,
-    current_user: Account = Depends(get_current_user),
+    current_user: Account = Depends(
+        require_permission(PAGES_ADMIN_PATH, "delete")
+    ),
 ):
     """Delete a page."""
     statement = select(Page).where(Page.id == page_id)
@@ -128,6 +151,8 @@ async def delete_page(
     # Then delete the page
     await session.delete(db_page)
     await session.commit()
+    permission_matrix.remove_page(page_id)
+    menu_cache.invalidate()
 
     return None
 
@@ -137,7 +162,9 @@ async def delete_page(
 async def create_role_page_permission(
     permission: RolePagePermissionCreate,
     session: SessionDep,
-    current_user: Account = Depends(get_current_user),
+    current_user: Account = Depends(
+        require_permission(ROLES_ADMIN_PATH, "create")
+    ),
 ):
     """Assign a page permission to a role."""
     # Check if permission already exists
@@ -162,6 +189,15 @@ async def create_role_page_permission(
     session.add(db_permission)
     await session.commit()
     await session.refresh(db_permission)
+    permission_matrix.set_permission(
+        db_permission.role_id,
+        db_permission.page_id,
+        db_permission.can_view,
+        db_permission.can_create,
+        db_permission.can_edit,
+        db_permission.can_delete,
+    )
+    menu_cache.invalidate()
     return db_permission
 
 
@@ -197,6 +233,112 @@ async def read_page_permissions(
     return results.scalars().all()
 
 
+@permission_router.put(
+    "/role/{role_id}/matrix", response_model=List[RolePagePermissionRead]
+)
+async def replace_role_permission_matrix(
+    role_id: int,
+    matrix: List[RolePagePermissionMatrixItem],
+    session: SessionDep,
+    current_user: Account = Depends(
+        require_permission(ROLES_ADMIN_PATH, "edit")
+    ),
+):
+    """
+    Replace a role's whole permission grid in one round trip.
+
+    The body is the desired matrix; pages left out of it, or sent with every
+    flag false, lose their row. Current rows are read in one query, and the
+    difference is applied as batched INSERT/UPDATE/DELETE statements in a
+    single transaction.
+    """
+    role = snapshot_store.lookup(Role, role_id) or await session.get(
+        Role, role_id
+    )
+    if not role:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Role not found"
+        )
+
+    desired = {
+        item.page_id: (
+            item.can_view,
+            item.can_create,
+            item.can_edit,
+            item.can_delete,
+        )
+        for item in matrix
+        if item.can_view or item.can_create or item.can_edit or item.can_delete
+    }
+    if desired:
+        page_results = await session.execute(
+            select(Page.id).where(Page.id.in_(desired.keys()))
+        )
+        unknown = set(desired) - set(page_results.scalars().all())
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown page id(s): {sorted(unknown)}",
+            )
+
+    statement = select(RolePagePermission).where(
+        RolePagePermission.role_id == role_id
+    )
+    results = await session.execute(statement)
+    current = {row.page_id: row for row in results.scalars().all()}
+
+    now = datetime.now(cairo_tz)
+    inserts, updates = [], []
+    for page_id, flags in desired.items():
+        values = dict(zip(MATRIX_FLAGS, flags))
+        row = current.get(page_id)
+        if row is None:
+            inserts.append(
+                dict(
+                    values,
+                    role_id=role_id,
+                    page_id=page_id,
+                    created_at=now,
+                    updated_at=now,
+                    updated_by=current_user.id,
+                )
+            )
+        elif any(getattr(row, flag) != values[flag] for flag in MATRIX_FLAGS):
+            updates.append(
+                dict(
+                    values,
+                    id=row.id,
+                    updated_at=now,
+                    updated_by=current_user.id,
+                )
+            )
+    deletes = [
+        row.id for page_id, row in current.items() if page_id not in desired
+    ]
+
+    if inserts:
+        await session.execute(insert(RolePagePermission), inserts)
+    if updates:
+        await session.execute(update(RolePagePermission), updates)
+    if deletes:
+        await session.execute(
+            delete(RolePagePermission).where(
+                RolePagePermission.id.in_(deletes)
+            )
+        )
+    await session.commit()
+
+    permission_matrix.set_role_permissions(role_id, desired)
+    menu_cache.invalidate()
+
+    results = await session.execute(
+        statement.order_by(RolePagePermission.page_id).execution_options(
+            populate_existing=True
+        )
+    )
+    return results.scalars().all()
+
+
 @permission_router.put(
     "/role-page/{permission_id}", response_model=RolePagePermissionRead
 )
@@ -204,7 +346,9 @@ async def update_role_page_permission(
     permission_id: int,
     permission_update: RolePagePermissionUpdate,
     session: SessionDep,
-    current_user: Account = Depends(get_current_user),
+    current_user: Account = Depends(
+        require_permission(ROLES_ADMIN_PATH, "edit")
+    ),
 ):
     """Update a role-page permission."""
     statement = select(RolePagePermission).where(
@@ -226,6 +370,15 @@ async def update_role_page_permission(
     db_permission.updated_by = current_user.id
     await session.commit()
     await session.refresh(db_permission)
+    permission_matrix.set_permission(
+        db_permission.role_id,
+        db_permission.page_id,
+        db_permission.can_view,
+        db_permission.can_create,
+        db_permission.can_edit,
+        db_permission.can_delete,
+    )
+    menu_cache.invalidate()
     return db_permission
 
 
@@ -235,7 +388,9 @@ async def update_role_page_permission(
 async def delete_role_page_permission(
     permission_id: int,
     session: SessionDep,
-    current_user: Account = Depends(get_current_user),
+    current_user: Account = Depends(
+        require_permission(ROLES_ADMIN_PATH, "delete")
+    ),
 ):
     """Delete a role-page permission."""
     statement = select(RolePagePermission).where(
@@ -250,44 +405,63 @@ async def delete_role_page_permission(
             detail="Permission not found",
         )
 
+    role_id, page_id = db_permission.role_id, db_permission.page_id
     await session.delete(db_permission)
     await session.commit()
+    permission_matrix.remove_permission(role_id, page_id)
+    menu_cache.invalidate()
 
     return None
 
 
+@permission_router.get("/page-index")
+async def read_permission_page_index(
+    current_user: Account = Depends(get_current_user),
+):
+    """
+    Page slot map and version for decoding the "perm" bitmap in access
+    tokens, so other services can authorize requests without DB access.
+    """
+    return permission_matrix.page_index()
+
+
 # Add a helper endpoint to get user accessible pages
-@permission_router.get("/my-pages", response_model=List[PageRead])
+@permission_router.get(
+    "/my-pages", response_model=Union[List[PageRead], List[MenuItem]]
+)
 async def read_my_accessible_pages(
-    session: SessionDep, current_user: Account = Depends(get_current_user)
+    session: SessionDep,
+    locale: Optional[Literal["en", "ar"]] = None,
+    current_user: Account = Depends(get_current_user),
 ):
-    """Get all pages accessible to the current user based on their roles."""
-    # Get user's roles
-    role_statement = (
-        select(Role.id)
-        .join(AccountPermission, AccountPermission.role_id == Role.id)
-        .where(AccountPermission.account_id == current_user.id)
-    )
-
-    role_results = await session.execute(role_statement)
-    role_ids = role_results.scalars().all()
+    """
+    Get all pages accessible to the current user based on their roles.
+    Served from the per-role-set menu cache; the roles come from the token.
+    """
+    role_ids = current_user.roles or []
 
     # If user has no roles, return empty list
     if not role_ids:
         return []
 
-    # Get pages accessible to user's roles
-    page_statement = (
-        select(Page)
-        .join(RolePagePermission, RolePagePermission.page_id == Page.id)
-        .where(
-            and_(
-                RolePagePermission.role_id.in_(role_ids),
-                RolePagePermission.can_view == True,
+    body = menu_cache.get(role_ids, locale)
+    if body is None:
+        # Get pages accessible to user's roles
+        page_statement = (
+            select(Page)
+            .join(RolePagePermission, RolePagePermission.page_id == Page.id)
+            .where(
+                and_(
+                    RolePagePermission.role_id.in_(role_ids),
+                    RolePagePermission.can_view == True,
+                )
             )
+            .distinct()
+            .order_by(Page.id)
         )
-        .distinct()
-    )
 
-    page_results = await session.execute(page_statement)
-    return page_results.scalars().all()
+        page_results = await session.execute(page_statement)
+        body = serialize_menu(page_results.scalars().all(), locale)
+        menu_cache.put(role_ids, locale, body)
+
+    return Response(content=body, media_type="application/json")
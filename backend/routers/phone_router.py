@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Query
+from db.models import Phone
+from db.schemas import PhoneCheckRead, PhoneCreate, PhoneRead, PhoneUpdate
+from core.blocked_phones import blocked_phones, normalize_phone_number
+from core.crud import CrudSpec, add_crud_routes
+
+router = APIRouter(prefix="/phones", tags=["Phone"])
+
+
+def _normalize_number(data: dict) -> dict:
+    if data.get("phone_number"):
+        data["phone_number"] = normalize_phone_number(data["phone_number"])
+    return data
+
+
+@router.get("/check", response_model=PhoneCheckRead)
+async def check_phone(phone_number: str = Query(..., min_length=1)):
+    """
+    Whether a number is blocked, answered from memory (see
+    core.blocked_phones). No session is opened unless a bloom filter
+    hit needs confirming.
+    """
+    return PhoneCheckRead(
+        phone_number=normalize_phone_number(phone_number),
+        is_blocked=await blocked_phones.is_blocked(phone_number),
+    )
+
+
+add_crud_routes(
+    router,
+    CrudSpec(
+        model=Phone,
+        name="phone",
+        plural="phones",
+        read_schema=PhoneRead,
+        create_schema=PhoneCreate,
+        update_schema=PhoneUpdate,
+        prepare=_normalize_number,
+        on_write=(blocked_phones.on_write,),
+        filters=("phone_number", "is_blocked"),
+    ),
+)